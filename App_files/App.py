@@ -1,23 +1,134 @@
 # app.py
 import sqlite3
 from datetime import datetime
-import base64
 import os
 import pandas as pd
+from openpyxl import load_workbook
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
 import json
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+import re
+import logging
+import logging.handlers
+import atexit
+import queue
+import zipfile
+import gzip
+import zlib
+import html
+import hashlib
+import time
+import xml.etree.ElementTree as ET
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g, make_response, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.security import generate_password_hash, check_password_hash
 
+logger = logging.getLogger(__name__)
+
+# Сообщения журнала выводятся отдельным потоком через очередь, чтобы запись
+# в консоль не задерживала обработку запросов
+_log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.propagate = False
+logger.setLevel(logging.INFO)
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 # ========== Flask приложение ==========
+class OrjsonProvider(DefaultJSONProvider):
+    """Разбор и сериализация JSON через orjson (если установлен) вместо стандартного json"""
+    
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        # Тело запроса (request.json) разбирается из байтов без предварительного декодирования
+        return orjson.loads(s)
+    
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        # orjson всегда пишет компактно, параметры форматирования не нужны
+        return orjson.dumps(obj, default=str).decode()
+    
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        # Байты из orjson отдаются в ответ напрямую, без промежуточной строки
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=str), mimetype=self.mimetype)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = 'your-secret-key-here-change-in-production'
+# Статические файлы с версией в URL (static_url) кешируются браузером на год,
+# остальные перепроверяются по ETag
+STATIC_VERSIONED_MAX_AGE = 31536000
 
 # ========== База данных SQLite ==========
+DB_PATH = 'service_requests.db'
+# Версия схемы БД (PRAGMA user_version); увеличивается при изменении структуры таблиц
+SCHEMA_VERSION = 8
+DB_POOL_SIZE = 8
+# Файл базы читается через mmap (до 256 МБ) вместо отдельных вызовов read()
+DB_MMAP_SIZE = 256 * 1024 * 1024
+
+# Пул открытых соединений: запрос берет соединение из пула и возвращает его по завершении
+_db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+def _open_db_connection():
+    """Открытие нового соединения с базой данных"""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # WAL сохраняется в файле базы (обычно его уже включил init_db), остальные настройки
+    # действуют только для соединения; соединения живут в пуле, поэтому выполняется это редко
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    conn.create_function('fold_case', 1, fold_case, deterministic=True)
+    return conn
+
+def get_db():
+    """Получение соединения с базой данных для текущего запроса"""
+    conn = g.get('_db')
+    if conn is None:
+        try:
+            conn = _db_pool.get_nowait()
+        except queue.Empty:
+            conn = _open_db_connection()
+        g._db = conn
+    return conn
+
+@app.teardown_appcontext
+def release_db(exception=None):
+    """Возврат соединения в пул (незавершенная транзакция откатывается)"""
+    conn = g.pop('_db', None)
+    if conn is None:
+        return
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _db_pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
 def init_db():
     """Инициализация базы данных с таблицами для системы учета заявок"""
-    db_path = 'service_requests.db'
-    conn = sqlite3.connect(db_path)
+    db_path = DB_PATH
+    conn = sqlite3.connect(db_path, isolation_level='DEFERRED')
+    # Журнал WAL и ослабленная синхронизация: массовая загрузка
+    # выполняется без fsync на каждую вставку
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
     cursor = conn.cursor()
     
     # Проверяем существование таблицы users
@@ -26,13 +137,17 @@ def init_db():
         create_tables_from_scratch(conn, cursor)
     else:
         print(f"База данных {db_path} уже существует, используем существующие таблицы")
-        # Проверяем и исправляем структуру таблиц при необходимости
-        check_and_update_tables(conn, cursor)
+        # Структуру таблиц проверяем, только если версия схемы устарела
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] < SCHEMA_VERSION:
+            check_and_update_tables(conn, cursor)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         
         cursor.execute("SELECT COUNT(*) FROM users")
         user_count = cursor.fetchone()[0]
         if user_count == 0:
-            load_users_from_xlsx(conn, cursor)
+            with conn:
+                load_users_from_xlsx(conn, cursor)
     
     conn.commit()
     conn.close()
@@ -107,14 +222,11 @@ def check_and_update_tables(conn, cursor):
                     select_columns.append('NULL')
                     insert_columns.append(col)
             
-            # Копируем данные
-            select_sql = f"SELECT {', '.join(select_columns)} FROM comments"
-            cursor.execute(select_sql)
-            rows = cursor.fetchall()
-            
-            if rows:
-                insert_sql = f"INSERT INTO comments_new ({', '.join(insert_columns)}) VALUES ({', '.join(['?'] * len(insert_columns))})"
-                cursor.executemany(insert_sql, rows)
+            # Копируем данные одним запросом внутри SQLite
+            cursor.execute(f"""
+            INSERT INTO comments_new ({', '.join(insert_columns)})
+            SELECT {', '.join(select_columns)} FROM comments
+            """)
             
             # Удаляем старую таблицу и переименовываем новую
             cursor.execute("DROP TABLE comments")
@@ -163,6 +275,24 @@ def check_and_update_tables(conn, cursor):
             FOREIGN KEY (request_id) REFERENCES service_requests(request_id)
         )
         ''')
+    
+    # Тип неисправности хранится в заявке, чтобы статистика не разбирала описания при каждом запросе
+    cursor.execute("PRAGMA table_info(service_requests)")
+    if 'problem_type' not in [col[1] for col in cursor.fetchall()]:
+        print("Добавляем столбец problem_type в таблицу service_requests...")
+        cursor.execute("ALTER TABLE service_requests ADD COLUMN problem_type TEXT")
+        conn.create_function('classify_problem', 1, classify_problem, deterministic=True)
+        cursor.execute("UPDATE service_requests SET problem_type = classify_problem(problem_description)")
+    
+    # Тип пользователя читается из самого комментария; в старых строках его берем из users
+    cursor.execute('''
+        UPDATE comments
+        SET user_type = (SELECT user_type FROM users WHERE users.id = comments.user_id)
+        WHERE user_type IS NULL AND user_id IS NOT NULL
+    ''')
+    
+    create_indexes(cursor)
+    create_search_index(cursor)
 
 def create_tables_from_scratch(conn, cursor):
     """Создание всех таблиц с нуля на основе данных из xlsx"""
@@ -233,6 +363,7 @@ def create_tables_from_scratch(conn, cursor):
         completion_date TIMESTAMP,
         days_in_process INTEGER,
         repair_parts TEXT,
+        problem_type TEXT,
         has_comment BOOLEAN DEFAULT FALSE,
         master_id INTEGER,
         master_fio TEXT,
@@ -268,18 +399,268 @@ def create_tables_from_scratch(conn, cursor):
     # Загружаем данные из всех файлов
     load_all_data(conn, cursor)
     
+    # Индексы создаем после массовой загрузки
+    create_indexes(cursor)
+    create_search_index(cursor)
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
     print("Таблицы успешно созданы и данные загружены")
 
+def create_indexes(cursor):
+    """Создание индексов для частых выборок (login и request_id уже индексированы через UNIQUE)"""
+    indexes = [
+        # Комментарии заявки выбираются сразу в порядке вывода, без сортировки
+        "CREATE INDEX IF NOT EXISTS idx_comments_request_created ON comments(request_id, created_at DESC, id DESC)",
+        "DROP INDEX IF EXISTS idx_comments_request",
+        "CREATE INDEX IF NOT EXISTS idx_masters_user_id ON masters(user_id)",
+        # Списки заявок: отбор по клиенту или мастеру и порядок выдачи берутся из индекса без сортировки
+        "CREATE INDEX IF NOT EXISTS idx_requests_client_date ON service_requests(client_login, start_date DESC, request_id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_requests_master_date ON service_requests(master_id, start_date DESC, request_id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_requests_date ON service_requests(start_date DESC, request_id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_requests_status ON service_requests(request_status)",
+        # Индекс по master_id покрывается idx_requests_master_date
+        "DROP INDEX IF EXISTS idx_requests_master",
+        "CREATE INDEX IF NOT EXISTS idx_comments_master ON comments(master_id)",
+        "CREATE INDEX IF NOT EXISTS idx_requests_problem_type ON service_requests(problem_type)",
+    ]
+    
+    for index_sql in indexes:
+        try:
+            cursor.execute(index_sql)
+        except sqlite3.OperationalError as e:
+            # В старых базах может не быть нужного столбца
+            print(f"Не удалось создать индекс: {e}")
+    
+    # Статистика по индексам для планировщика запросов
+    cursor.execute("ANALYZE")
+
+# Поля заявки, по которым работает поиск
+SEARCH_COLUMNS = ('request_id', 'problem_description', 'client_fio', 'client_phone', 'tech_type', 'tech_model')
+
+def create_search_index(cursor):
+    """Создание полнотекстового индекса FTS5 по заявкам (синхронизируется триггерами)"""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='requests_fts'")
+    existing = cursor.fetchone()
+    if existing is not None and 'trigram' in existing[0]:
+        return
+    if existing is not None:
+        # Индекс по словам из прежней версии заменяется индексом по триграммам
+        for trigger in ('requests_fts_insert', 'requests_fts_delete', 'requests_fts_update'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute("DROP TABLE requests_fts")
+    
+    print("Создаем полнотекстовый индекс requests_fts...")
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{col}' for col in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{col}' for col in SEARCH_COLUMNS)
+    
+    # Индекс хранит только триграммы, сами тексты читаются из service_requests;
+    # триграммы позволяют искать подстроку с любого места, как LIKE '%...%',
+    # и не различают регистр (в том числе у кириллицы)
+    cursor.execute(f'''
+    CREATE VIRTUAL TABLE requests_fts USING fts5(
+        {columns}, content='service_requests', content_rowid='id', tokenize='trigram'
+    )
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER requests_fts_insert AFTER INSERT ON service_requests BEGIN
+        INSERT INTO requests_fts(rowid, {columns}) VALUES (new.id, {new_values});
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER requests_fts_delete AFTER DELETE ON service_requests BEGIN
+        INSERT INTO requests_fts(requests_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+    END
+    ''')
+    # Смена статуса или мастера индекс не затрагивает
+    cursor.execute(f'''
+    CREATE TRIGGER requests_fts_update AFTER UPDATE OF {columns} ON service_requests BEGIN
+        INSERT INTO requests_fts(requests_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        INSERT INTO requests_fts(rowid, {columns}) VALUES (new.id, {new_values});
+    END
+    ''')
+    
+    # Уже загруженные заявки индексируются одним проходом
+    cursor.execute("INSERT INTO requests_fts(requests_fts) VALUES ('rebuild')")
+
+# Типы неисправностей для статистики: заявке присваивается первый тип,
+# ключевое слово которого встречается в описании проблемы
+PROBLEM_TYPES = (
+    ('Не работает', ('не работает', 'перестал')),
+    ('Проблемы с охлаждением', ('мороз', 'холод')),
+    ('Шум/вибрация', ('гудит', 'шум')),
+    ('Проблемы с включением', ('включаться', 'запуск')),
+)
+DEFAULT_PROBLEM_TYPE = 'Другое'
+
+def classify_problem(description):
+    """Тип неисправности по описанию проблемы (сохраняется в service_requests.problem_type)"""
+    text = (description or '').lower()
+    for problem_type, keywords in PROBLEM_TYPES:
+        if any(keyword in text for keyword in keywords):
+            return problem_type
+    return DEFAULT_PROBLEM_TYPE
+
 def load_all_data(conn, cursor):
-    """Загрузка данных из всех Excel файлов"""
-    # 1. Сначала загружаем пользователей
-    load_users_from_xlsx(conn, cursor)
+    """Загрузка данных из всех Excel файлов (одной транзакцией)"""
+    with conn:
+        # 1. Сначала загружаем пользователей
+        load_users_from_xlsx(conn, cursor)
+        
+        # 2. Загружаем заявки
+        load_requests_from_xlsx(conn, cursor)
+        
+        # 3. Загружаем комментарии
+        load_comments_from_xlsx(conn, cursor)
+
+# Строковые значения ячеек, которые считаются пустыми (как в pd.read_excel)
+EXCEL_NA_VALUES = {'', 'null', 'NULL', 'None', 'nan', 'NaN', 'NA', 'N/A', 'n/a', '#N/A'}
+
+# Метод хеширования паролей начальных (тестовых) учетных записей. Их пароли
+# и так показываются на странице входа, поэтому при массовой загрузке используется
+# pbkdf2 с малым числом итераций вместо медленного метода по умолчанию
+SEED_PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+
+def hash_seed_password(password):
+    """Хеширование пароля начальной учетной записи"""
+    return generate_password_hash(password, method=SEED_PASSWORD_HASH_METHOD)
+
+# Нужные загрузчикам столбцы Excel файлов и их типы
+USERS_COLUMNS = {
+    'userID': 'Int64', 'fio': 'string', 'phone': 'string',
+    'login': 'string', 'password': 'string', 'type': 'string'
+}
+REQUESTS_COLUMNS = {
+    # inputDataRequests.xlsx
+    'requestID': 'Int64', 'startDate': 'string', 'homeTechType': 'string',
+    'homeTechModel': 'string', 'problemDescryption': 'string', 'requestStatus': 'string',
+    'completionDate': 'string', 'repairParts': 'string', 'masterID': 'Int64', 'clientID': 'Int64',
+    # service_requests_combined.xlsx
+    'request_id': 'Int64', 'start_date': 'datetime64[ns]', 'tech_type': 'string',
+    'tech_model': 'string', 'problem_description': 'string', 'request_status': 'string',
+    'completion_date': 'datetime64[ns]', 'days_in_process': 'Int64', 'repair_parts': 'string',
+    'has_comment': 'boolean', 'master_id': 'Int64', 'master_fio': 'string',
+    'master_phone': 'string', 'master_login': 'string', 'client_id': 'Int64',
+    'client_fio': 'string', 'client_phone': 'string', 'client_login': 'string',
+    'client_type': 'string'
+}
+COMMENTS_COLUMNS = {
+    'commentID': 'Int64', 'message': 'string', 'masterID': 'Int64', 'requestID': 'Int64'
+}
+
+def read_excel_sheet(file_path, sheet_name='Sheet1', columns=None):
+    """Потоковое чтение листа Excel в DataFrame через openpyxl (read_only)
     
-    # 2. Загружаем заявки
-    load_requests_from_xlsx(conn, cursor)
+    columns - словарь {столбец: тип}: читаются только эти столбцы (отсутствующие
+    в файле пропускаются), типы задаются сразу без автоматического определения
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = next(rows, ())
+        if columns is None:
+            positions = list(range(len(header)))
+        else:
+            positions = [i for i, name in enumerate(header) if name in columns]
+        
+        data = []
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i in positions]
+            values = [None if isinstance(value, str) and value in EXCEL_NA_VALUES else value
+                      for value in values]
+            # Пропускаем полностью пустые строки в конце листа
+            if any(value is not None for value in values):
+                data.append(values)
+        
+        names = [header[i] for i in positions]
+        if columns is None:
+            return pd.DataFrame(data, columns=names)
+        df = pd.DataFrame(data, columns=names, dtype=object)
+        return df.astype({name: columns[name] for name in names})
+    finally:
+        workbook.close()
+
+# Пространство имен SpreadsheetML для разбора XML внутри XLSX файла
+XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+def xlsx_cell_value(cell, shared_strings):
+    """Значение ячейки XLSX с учетом ее типа (общие строки, числа, логические значения)"""
+    cell_type = cell.get('t')
+    if cell_type == 'inlineStr':
+        return ''.join(text.text or '' for text in cell.iter(f'{XLSX_NS}t'))
     
-    # 3. Загружаем комментарии
-    load_comments_from_xlsx(conn, cursor)
+    value = cell.findtext(f'{XLSX_NS}v')
+    if value is None:
+        return None
+    if cell_type == 's':
+        return shared_strings[int(value)]
+    if cell_type == 'b':
+        return value == '1'
+    if cell_type in ('str', 'e'):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+def read_xlsx_rows(file_path, sheet_path='xl/worksheets/sheet1.xml', columns=None):
+    """Чтение листа XLSX напрямую из zip-архива в список словарей {столбец: значение}
+    
+    Первая строка листа считается заголовком, columns - столбцы, которые нужно оставить.
+    Предназначено для небольших справочников, где построение DataFrame обходится
+    дороже самого разбора файла; даты не преобразуются и остаются числами Excel
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in archive.namelist():
+            with archive.open('xl/sharedStrings.xml') as strings_file:
+                shared_strings = [
+                    ''.join(text.text or '' for text in item.iter(f'{XLSX_NS}t'))
+                    for item in ET.parse(strings_file).getroot()
+                ]
+        
+        header = None
+        rows = []
+        with archive.open(sheet_path) as sheet_file:
+            for _, element in ET.iterparse(sheet_file, events=('end',)):
+                if element.tag != f'{XLSX_NS}row':
+                    continue
+                
+                # Ячейки с пустыми значениями в XML отсутствуют, поэтому сопоставляем по букве столбца
+                values = {
+                    cell.get('r', '').rstrip('0123456789'): xlsx_cell_value(cell, shared_strings)
+                    for cell in element.iter(f'{XLSX_NS}c')
+                }
+                element.clear()
+                
+                if header is None:
+                    header = {column: name for column, name in values.items()
+                              if columns is None or name in columns}
+                else:
+                    rows.append({name: values.get(column) for column, name in header.items()})
+    
+    return rows
+
+def insert_from_staging(conn, table, df, columns=None, select_sql=None):
+    """Массовая вставка DataFrame через промежуточную таблицу (executemany + INSERT ... SELECT)"""
+    staging_table = f'{table}_staging'
+    staging_columns = ', '.join(df.columns)
+    columns = ', '.join(columns) if columns else staging_columns
+    select_sql = select_sql or f'SELECT {staging_columns} FROM {{staging}}'
+
+    # Промежуточная таблица временная и заполняется на том же соединении без commit,
+    # поэтому загрузка остается внутри общей транзакции load_all_data
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    cursor = conn.cursor()
+    cursor.execute(f'DROP TABLE IF EXISTS temp.{staging_table}')
+    cursor.execute(f'CREATE TEMP TABLE {staging_table} ({staging_columns})')
+    try:
+        placeholders = ', '.join('?' * len(df.columns))
+        cursor.executemany(f'INSERT INTO {staging_table} VALUES ({placeholders})', rows)
+        cursor.execute(f'INSERT OR REPLACE INTO {table} ({columns}) ' + select_sql.format(staging=staging_table))
+        return cursor.rowcount
+    finally:
+        cursor.execute(f'DROP TABLE IF EXISTS temp.{staging_table}')
 
 def load_users_from_xlsx(conn, cursor):
     """Загрузка данных пользователей из Excel файла"""
@@ -290,7 +671,7 @@ def load_users_from_xlsx(conn, cursor):
             create_default_users(conn, cursor)
             return
             
-        df = pd.read_excel(users_file_path, sheet_name='Sheet1')
+        df = read_excel_sheet(users_file_path, columns=USERS_COLUMNS)
         print(f"Загружено {len(df)} записей из Excel файла пользователей")
         
         # Тип пользователя для соответствия с нашей системой
@@ -301,47 +682,34 @@ def load_users_from_xlsx(conn, cursor):
             'Заказчик': 'client'
         }
         
-        for idx, row in df.iterrows():
-            try:
-                user_id = int(row['userID']) if pd.notna(row['userID']) else idx + 1
-                user_type_excel = row['type'] if pd.notna(row['type']) else 'Заказчик'
-                user_type = type_mapping.get(user_type_excel, 'client')
-                
-                password = str(row['password']) if pd.notna(row['password']) else 'password123'
-                password_hash = generate_password_hash(password)
-                
-                # Добавляем пользователя
-                cursor.execute('''
-                INSERT OR REPLACE INTO users (id, login, password_hash, fio, phone, user_type)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    user_id,
-                    row['login'] if pd.notna(row['login']) else f'user{idx+1}',
-                    password_hash,
-                    row['fio'] if pd.notna(row['fio']) else f'Пользователь {idx+1}',
-                    str(row['phone']) if pd.notna(row['phone']) else '',
-                    user_type
-                ))
-                
-                # Если пользователь является специалистом, добавляем его в таблицу мастеров
-                if user_type == 'master':
-                    cursor.execute('''
-                    INSERT OR REPLACE INTO masters (user_id, master_fio, master_phone, master_login, master_type)
-                    VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        user_id,
-                        row['fio'] if pd.notna(row['fio']) else f'Пользователь {idx+1}',
-                        str(row['phone']) if pd.notna(row['phone']) else '',
-                        row['login'] if pd.notna(row['login']) else f'user{idx+1}',
-                        'Мастер'
-                    ))
-                
-                print(f"Добавлен пользователь: {row['login']} ({user_type})")
-                
-            except Exception as e:
-                print(f"Ошибка при обработке пользователя {idx}: {e}")
+        # Значения по умолчанию для пустых ячеек (номер строки, начиная с 1)
+        row_numbers = pd.Series(range(1, len(df) + 1), index=df.index)
+
+        df['user_id'] = df['userID'].fillna(row_numbers).astype(int)
+        df['user_type_mapped'] = df['type'].fillna('Заказчик').map(type_mapping).fillna('client')
+        df['login'] = df['login'].fillna('user' + row_numbers.astype(str))
+        df['fio'] = df['fio'].fillna('Пользователь ' + row_numbers.astype(str))
+        df['phone'] = df['phone'].fillna('')
+
+        # Хеширование паролей - самая затратная часть загрузки; hashlib отпускает
+        # GIL, поэтому хеши считаются параллельно в пуле потоков
+        passwords = df['password'].fillna('password123').astype(str).tolist()
+        with ThreadPoolExecutor() as executor:
+            df['password_hash'] = list(executor.map(hash_seed_password, passwords))
+
+        # Добавляем всех пользователей одним пакетом через промежуточную таблицу
+        users_df = df[['user_id', 'login', 'password_hash', 'fio', 'phone', 'user_type_mapped']].rename(
+            columns={'user_id': 'id', 'user_type_mapped': 'user_type'}
+        )
+        users_count = insert_from_staging(conn, 'users', users_df)
+
+        # Специалистов переносим в таблицу мастеров одним запросом
+        cursor.execute('''
+        INSERT OR REPLACE INTO masters (user_id, master_fio, master_phone, master_login, master_type)
+        SELECT id, fio, phone, login, 'Мастер' FROM users WHERE user_type = 'master'
+        ''')
         
-        print(f"Загружено {len(df)} пользователей в базу данных")
+        print(f"Загружено {users_count} пользователей в базу данных (мастеров: {cursor.rowcount})")
         
     except Exception as e:
         print(f"Ошибка при загрузке пользователей из Excel: {e}")
@@ -359,129 +727,91 @@ def load_requests_from_xlsx(conn, cursor):
             print(f"Файл заявок не найден!")
             return
             
-        df = pd.read_excel(requests_file_path, sheet_name='Sheet1')
+        df = read_excel_sheet(requests_file_path, columns=REQUESTS_COLUMNS)
         print(f"Загружено {len(df)} записей из Excel файла заявок")
         
-        for idx, row in df.iterrows():
-            try:
-                # Для service_requests_combined.xlsx
-                if 'client_id' in df.columns:
-                    client_id = int(row['client_id']) if pd.notna(row['client_id']) else None
-                    master_id = int(row['master_id']) if pd.notna(row['master_id']) else None
-                    
-                    # Получаем данные клиента
-                    cursor.execute("SELECT fio, phone, login, user_type FROM users WHERE id = ?", (client_id,))
-                    client_data = cursor.fetchone()
-                    
-                    # Получаем данные мастера
-                    master_fio = row['master_fio'] if pd.notna(row['master_fio']) else ''
-                    master_phone = str(row['master_phone']) if pd.notna(row['master_phone']) else ''
-                    master_login = row['master_login'] if pd.notna(row['master_login']) else ''
-                    
-                    cursor.execute('''
-                    INSERT OR REPLACE INTO service_requests (
-                        request_id, start_date, tech_type, tech_model, problem_description,
-                        request_status, completion_date, days_in_process, repair_parts,
-                        has_comment, master_id, master_fio, master_phone, master_login, master_type,
-                        client_id, client_fio, client_phone, client_login, client_type
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        int(row['request_id']) if pd.notna(row['request_id']) else idx + 1,
-                        row['start_date'] if pd.notna(row['start_date']) else datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        row['tech_type'] if pd.notna(row['tech_type']) else '',
-                        row['tech_model'] if pd.notna(row['tech_model']) else '',
-                        row['problem_description'] if pd.notna(row['problem_description']) else '',
-                        row['request_status'] if pd.notna(row['request_status']) else 'Новая заявка',
-                        row['completion_date'] if pd.notna(row['completion_date']) else None,
-                        int(row['days_in_process']) if pd.notna(row['days_in_process']) else 0,
-                        row['repair_parts'] if pd.notna(row['repair_parts']) else '',
-                        bool(row['has_comment']) if pd.notna(row['has_comment']) else False,
-                        master_id,
-                        master_fio,
-                        master_phone,
-                        master_login,
-                        'Мастер' if master_id else '',
-                        client_id,
-                        row['client_fio'] if pd.notna(row['client_fio']) else 'Неизвестный клиент',
-                        str(row['client_phone']) if pd.notna(row['client_phone']) else '',
-                        row['client_login'] if pd.notna(row['client_login']) else '',
-                        row['client_type'] if pd.notna(row['client_type']) else 'client'
-                    ))
-                else:
-                    # Для inputDataRequests.xlsx
-                    client_id = int(row['clientID']) if pd.notna(row['clientID']) else None
-                    master_id = int(row['masterID']) if pd.notna(row['masterID']) else None
-                    
-                    # Получаем данные клиента
-                    cursor.execute("SELECT fio, phone, login, user_type FROM users WHERE id = ?", (client_id,))
-                    client_data = cursor.fetchone()
-                    
-                    # Получаем данные мастера
-                    master_data = None
-                    if master_id:
-                        cursor.execute("SELECT master_fio, master_phone, master_login FROM masters WHERE id = ?", (master_id,))
-                        master_data = cursor.fetchone()
-                    
-                    # Обработка дат
-                    start_date = row['startDate']
-                    if isinstance(start_date, pd.Timestamp):
-                        start_date = start_date.strftime('%Y-%m-%d %H:%M:%S')
-                    else:
-                        start_date = str(start_date) if pd.notna(start_date) else datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    completion_date = row['completionDate']
-                    if pd.notna(completion_date):
-                        if isinstance(completion_date, pd.Timestamp):
-                            completion_date = completion_date.strftime('%Y-%m-%d %H:%M:%S')
-                        else:
-                            completion_date = str(completion_date)
-                    else:
-                        completion_date = None
-                    
-                    # Расчет days_in_process
-                    days_in_process = None
-                    if completion_date:
-                        try:
-                            start_dt = datetime.strptime(start_date[:10], '%Y-%m-%d')
-                            end_dt = datetime.strptime(completion_date[:10], '%Y-%m-%d')
-                            days_in_process = (end_dt - start_dt).days
-                        except:
-                            days_in_process = 0
-                    
-                    # Добавляем заявку
-                    cursor.execute('''
-                    INSERT OR REPLACE INTO service_requests (
-                        request_id, start_date, tech_type, tech_model, problem_description,
-                        request_status, completion_date, days_in_process, repair_parts,
-                        master_id, master_fio, master_phone, master_login, master_type,
-                        client_id, client_fio, client_phone, client_login, client_type
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        int(row['requestID']),
-                        start_date,
-                        row['homeTechType'] if pd.notna(row['homeTechType']) else '',
-                        row['homeTechModel'] if pd.notna(row['homeTechModel']) else '',
-                        row['problemDescryption'] if pd.notna(row['problemDescryption']) else '',
-                        row['requestStatus'] if pd.notna(row['requestStatus']) else 'Новая заявка',
-                        completion_date,
-                        days_in_process,
-                        row['repairParts'] if pd.notna(row['repairParts']) else '',
-                        master_id,
-                        master_data[0] if master_data else '',
-                        master_data[1] if master_data else '',
-                        master_data[2] if master_data else '',
-                        'Мастер' if master_data else '',
-                        client_id,
-                        client_data[0] if client_data else 'Неизвестный клиент',
-                        client_data[1] if client_data else '',
-                        client_data[2] if client_data else '',
-                        client_data[3] if client_data else 'client'
-                    ))
-                
-            except Exception as e:
-                print(f"Ошибка при обработке заявки {idx}: {e}")
+        is_combined_file = 'client_id' in df.columns
         
-        print(f"Загружено {len(df)} заявок в базу данных")
+        # Даты разбираем сразу для всего столбца, а не построчно
+        if is_combined_file:
+            start_dt = pd.to_datetime(df['start_date'], errors='coerce')
+            end_dt = pd.to_datetime(df['completion_date'], errors='coerce')
+        else:
+            start_dt = pd.to_datetime(df['startDate'], errors='coerce')
+            end_dt = pd.to_datetime(df['completionDate'], errors='coerce')
+        
+        start_dates = start_dt.dt.strftime('%Y-%m-%d %H:%M:%S').fillna(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        completion_dates = end_dt.dt.strftime('%Y-%m-%d %H:%M:%S').astype(object).where(end_dt.notna(), None)
+        
+        # Пустые ячейки заполняем значениями по умолчанию для всего столбца сразу
+        if is_combined_file:
+            # Для service_requests_combined.xlsx данные клиента и мастера берем из самого файла
+            row_numbers = pd.Series(range(1, len(df) + 1), index=df.index)
+            df = df.fillna({
+                'tech_type': '', 'tech_model': '', 'problem_description': '',
+                'request_status': 'Новая заявка', 'days_in_process': 0, 'repair_parts': '',
+                'has_comment': False, 'master_fio': '', 'master_phone': '', 'master_login': '',
+                'client_fio': 'Неизвестный клиент', 'client_phone': '', 'client_login': '',
+                'client_type': 'client'
+            })
+            
+            requests_df = df[[
+                'tech_type', 'tech_model', 'problem_description', 'request_status',
+                'days_in_process', 'repair_parts', 'has_comment', 'master_id',
+                'master_fio', 'master_phone', 'master_login',
+                'client_id', 'client_fio', 'client_phone', 'client_login', 'client_type'
+            ]].assign(
+                request_id=df['request_id'].fillna(row_numbers),
+                start_date=start_dates,
+                completion_date=completion_dates,
+                master_type=df['master_id'].fillna(0).ne(0).map({True: 'Мастер', False: ''})
+            )
+        else:
+            # Для inputDataRequests.xlsx данные клиента и мастера берем из справочников
+            days_in_process = (end_dt.dt.normalize() - start_dt.dt.normalize()).dt.days
+            
+            requests_df = pd.DataFrame({
+                'request_id': df['requestID'],
+                'start_date': start_dates,
+                'tech_type': df['homeTechType'].fillna(''),
+                'tech_model': df['homeTechModel'].fillna(''),
+                'problem_description': df['problemDescryption'].fillna(''),
+                'request_status': df['requestStatus'].fillna('Новая заявка'),
+                'completion_date': completion_dates,
+                'days_in_process': days_in_process.fillna(0).astype('Int64').where(end_dt.notna()),
+                'repair_parts': df['repairParts'].fillna(''),
+                'master_id': df['masterID'],
+                'client_id': df['clientID']
+            })
+            requests_df = requests_df[requests_df['request_id'].notna()]
+            
+            masters_df = pd.read_sql_query(
+                "SELECT id AS master_id, master_fio, master_phone, master_login, 'Мастер' AS master_type FROM masters",
+                conn
+            )
+            clients_df = pd.read_sql_query(
+                "SELECT id AS client_id, fio AS client_fio, phone AS client_phone, "
+                "login AS client_login, user_type AS client_type FROM users",
+                conn
+            )
+            requests_df = (
+                requests_df
+                .merge(masters_df, on='master_id', how='left')
+                .merge(clients_df, on='client_id', how='left')
+                .fillna({
+                    'master_fio': '', 'master_phone': '', 'master_login': '', 'master_type': '',
+                    'client_fio': 'Неизвестный клиент', 'client_phone': '', 'client_login': '',
+                    'client_type': 'client'
+                })
+            )
+        
+        requests_df['problem_type'] = requests_df['problem_description'].map(classify_problem)
+        
+        # Добавляем все заявки одним пакетом через промежуточную таблицу
+        if not requests_df.empty:
+            insert_from_staging(conn, 'service_requests', requests_df)
+        
+        print(f"Загружено {len(requests_df)} заявок в базу данных")
         
     except Exception as e:
         print(f"Ошибка при загрузке заявок из Excel: {e}")
@@ -494,68 +824,41 @@ def load_comments_from_xlsx(conn, cursor):
             print(f"Файл {comments_file_path} не найден!")
             return
             
-        df = pd.read_excel(comments_file_path, sheet_name='Sheet1')
+        df = read_excel_sheet(comments_file_path, columns=COMMENTS_COLUMNS)
         print(f"Загружено {len(df)} записей из Excel файла комментариев")
         
-        # Получаем словарь masterID -> user_id
-        cursor.execute("SELECT id, user_id, master_fio FROM masters")
-        masters_data = cursor.fetchall()
-        master_id_to_user_id = {}
-        master_id_to_fio = {}
-        
-        for master_row in masters_data:
-            master_id_to_user_id[master_row[0]] = master_row[1]
-            master_id_to_fio[master_row[0]] = master_row[2]
-        
-        # Получаем словарь user_id -> user_type
-        cursor.execute("SELECT id, user_type FROM users")
-        users_data = cursor.fetchall()
-        user_id_to_type = {row[0]: row[1] for row in users_data}
-        
-        for idx, row in df.iterrows():
-            try:
-                comment_id = int(row['commentID']) if pd.notna(row['commentID']) else None
-                request_id = int(row['requestID']) if pd.notna(row['requestID']) else None
-                master_id = int(row['masterID']) if pd.notna(row['masterID']) else None
-                
-                # Получаем user_id и данные пользователя для комментария
-                user_id = None
-                user_fio = None
-                user_type = None
-                
-                if master_id in master_id_to_user_id:
-                    user_id = master_id_to_user_id[master_id]
-                    user_fio = master_id_to_fio.get(master_id, 'Неизвестный мастер')
-                    user_type = user_id_to_type.get(user_id, 'master')
-                
-                # Добавляем комментарий
-                cursor.execute('''
-                INSERT OR REPLACE INTO comments (comment_id, request_id, master_id, user_id, user_fio, user_type, message)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    comment_id,
-                    request_id,
-                    master_id,
-                    user_id,
-                    user_fio,
-                    user_type,
-                    row['message'] if pd.notna(row['message']) else ''
-                ))
-                
-                # Обновляем флаг has_comment в заявке
-                if request_id:
-                    cursor.execute('''
-                    UPDATE service_requests 
-                    SET has_comment = 1 
-                    WHERE request_id = ?
-                    ''', (request_id,))
-                
-                print(f"Добавлен комментарий {comment_id} для заявки {request_id} от мастера {master_id}")
-                
-            except Exception as e:
-                print(f"Ошибка при обработке комментария {idx}: {e}")
+        # Данные мастеров и пользователей подтягиваем в SQL: masterID -> user_id, ФИО, тип
+        comments_df = pd.DataFrame({
+            'comment_id': df['commentID'],
+            'request_id': df['requestID'],
+            'master_id': df['masterID'],
+            'message': df['message'].fillna('')
+        })
+        comments_count = insert_from_staging(
+            conn, 'comments', comments_df,
+            columns=('comment_id', 'request_id', 'master_id', 'user_id', 'user_fio', 'user_type', 'message'),
+            select_sql='''
+            SELECT s.comment_id, s.request_id, s.master_id, m.user_id,
+                   CASE WHEN m.id IS NOT NULL THEN m.master_fio END,
+                   CASE WHEN m.id IS NOT NULL THEN COALESCE(u.user_type, 'master') END,
+                   s.message
+            FROM {staging} s
+            LEFT JOIN masters m ON m.id = s.master_id
+            LEFT JOIN users u ON u.id = m.user_id
+            '''
+        )
+        logger.debug("Добавлено %s комментариев из %s", comments_count, comments_file_path)
+        
+        # Обновляем флаг has_comment одним запросом для всех заявок с комментариями
+        cursor.execute('''
+        UPDATE service_requests 
+        SET has_comment = 1 
+        WHERE request_id IN (SELECT DISTINCT request_id FROM comments)
+        ''')
         
         print(f"Загружено {len(df)} комментариев в базу данных")
+        # Список готовых комментариев в памяти перечитывается при следующем запросе
+        _template_comments_cache['data'] = None
         
     except Exception as e:
         print(f"Ошибка при загрузке комментариев из Excel: {e}")
@@ -572,61 +875,108 @@ def create_default_users(conn, cursor):
         ('client2', 'client123', 'Клиент 2', '89152345678', 'client'),
     ]
     
-    for login, password, fio, phone, user_type in default_users:
-        password_hash = generate_password_hash(password)
-        cursor.execute('''
-        INSERT OR IGNORE INTO users (login, password_hash, fio, phone, user_type)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (login, password_hash, fio, phone, user_type))
-        
-        if user_type == 'master':
-            # Получаем user_id
-            cursor.execute("SELECT id FROM users WHERE login = ?", (login,))
-            user_row = cursor.fetchone()
-            if user_row:
-                user_id = user_row[0]
-                cursor.execute('''
-                INSERT OR IGNORE INTO masters (user_id, master_fio, master_phone, master_login, master_type)
-                VALUES (?, ?, ?, ?, ?)
-                ''', (user_id, fio, phone, login, 'Мастер'))
+    # Строки отдаются в executemany генераторами, без промежуточных списков
+    cursor.executemany('''
+    INSERT OR IGNORE INTO users (login, password_hash, fio, phone, user_type)
+    VALUES (?, ?, ?, ?, ?)
+    ''', (
+        (login, hash_seed_password(password), fio, phone, user_type)
+        for login, password, fio, phone, user_type in default_users
+    ))
+    
+    # user_id мастера подставляется подзапросом по логину
+    cursor.executemany('''
+    INSERT OR IGNORE INTO masters (user_id, master_fio, master_phone, master_login, master_type)
+    SELECT id, ?, ?, ?, 'Мастер' FROM users WHERE login = ?
+    ''', (
+        (fio, phone, login, login)
+        for login, password, fio, phone, user_type in default_users
+        if user_type == 'master'
+    ))
     
     print("Пользователи по умолчанию созданы")
 
-# Инициализация БД
-init_db()
+# Инициализация БД выполняется один раз при развертывании (flask --app App init-db),
+# а не при импорте модуля в каждом рабочем процессе
+@app.cli.command('init-db')
+def init_db_command():
+    """Создание таблиц и загрузка данных из Excel файлов"""
+    init_db()
+
+def static_url(filename):
+    """URL статического файла с версией по содержимому (долгий кеш браузера сбрасывается только при изменении файла)"""
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        version = hashlib.md5(f.read()).hexdigest()[:12]
+    return f'/static/{filename}?v={version}'
 
-# Функция для создания логотипа (остается без изменений)
-def create_logo():
+# Стили и скрипты страниц отдаются отдельными статическими файлами и кешируются браузером;
+# общие для обеих страниц переменные и сброс стилей вынесены в base.css
+BASE_CSS_URL = static_url('base.css')
+LOGIN_CSS_URL = static_url('login.css')
+LOGIN_JS_URL = static_url('login.js')
+MAIN_CSS_URL = static_url('main.css')
+MAIN_JS_URL = static_url('main.js')
+
+# Текстовые ответы сжимаются gzip (Brotli нет в стандартной библиотеке)
+COMPRESS_MIMETYPES = {'text/html', 'text/css', 'text/javascript', 'application/javascript',
+                      'application/json', 'image/svg+xml'}
+COMPRESS_MIN_SIZE = 500
+
+def gzip_stream(chunks):
+    """Сжатие потокового тела ответа: каждая часть отправляется сразу после сжатия"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
     try:
-        with open('logo.png', 'rb') as f:
-            logo_data = f.read()
-            logo_base64 = base64.b64encode(logo_data).decode('utf-8')
-            return "data:image/png;base64," + logo_base64
-    except FileNotFoundError:
-        print("Файл logo.png не найден, используется SVG логотип")
-        svg_content = '''<?xml version="1.0" encoding="UTF-8"?>
-<svg width="200" height="60" viewBox="0 0 200 60" xmlns="http://www.w3.org/2000/svg">
-    <defs>
-        <linearGradient id="grad1" x1="0%" y1="0%" x2="100%" y2="100%">
-            <stop offset="0%" style="stop-color:#667eea;stop-opacity:1" />
-            <stop offset="100%" style="stop-color:#764ba2;stop-opacity:1" />
-        </linearGradient>
-        <linearGradient id="grad2" x1="0%" y1="0%" x2="100%" y2="100%">
-            <stop offset="0%" style="stop-color:#4facfe;stop-opacity:1" />
-            <stop offset="100%" style="stop-color:#00f2fe;stop-opacity:1" />
-        </linearGradient>
-    </defs>
-    <rect width="200" height="60" rx="12" fill="url(#grad1)"/>
-    <rect x="15" y="10" width="40" height="40" rx="8" fill="url(#grad2)"/>
-    <path d="M25,25 L45,25 M25,30 L45,30 M25,35 L45,35" stroke="white" stroke-width="2" stroke-linecap="round"/>
-    <text x="65" y="28" font-family="Arial, sans-serif" font-size="14" font-weight="bold" fill="white">SERVICE</text>
-    <text x="65" y="42" font-family="Arial, sans-serif" font-size="12" fill="rgba(255,255,255,0.8)">CENTER</text>
-</svg>'''
-        
-        logo_base64 = "data:image/svg+xml;base64," + base64.b64encode(svg_content.encode('utf-8')).decode('utf-8')
-        return logo_base64
-
-logo_base64 = create_logo()
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        # Закрытие исходного потока освобождает контекст запроса (stream_with_context)
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+def weaken_etag(response):
+    """Сжатое тело отличается побайтно от исходного, поэтому строгий ETag становится слабым"""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+@app.after_request
+def compress_response(response):
+    """Сжатие текстовых ответов и неизменяемый кеш статических файлов с версией в URL"""
+    if request.endpoint == 'static' and 'v' in request.args:
+        # send_static_file без max-age ставит no-cache, для файлов с версией он снимается
+        response.cache_control.no_cache = False
+        response.cache_control.max_age = STATIC_VERSIONED_MAX_AGE
+        response.cache_control.immutable = True
+    
+    if response.status_code != 200 or response.mimetype not in COMPRESS_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if 'gzip' not in request.accept_encodings or 'Content-Encoding' in response.headers:
+        return response
+    
+    # Статические файлы отдаются через send_file потоком и сжимаются целиком
+    if response.direct_passthrough:
+        response.direct_passthrough = False
+    elif response.is_streamed:
+        # Потоковые ответы (страница входа, длинные списки) сжимаются по частям
+        response.response = gzip_stream(response.response)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = 'gzip'
+        weaken_etag(response)
+        return response
+    
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    
+    response.set_data(gzip.compress(data, compresslevel=6, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    weaken_etag(response)
+    return response
 
 # ========== Маршруты Flask ==========
 
@@ -634,11 +984,19 @@ logo_base64 = create_logo()
 def index():
     """Главная страница с аутентификацией"""
     if 'user_id' in session:
-        return render_main_page()
+        return main_page_response()
     elif request.method == 'POST':
         return handle_login_form()
     else:
-        return render_login_page()
+        return login_page_response()
+
+def session_master_id(cursor):
+    """ID мастера текущего пользователя: ищется один раз и хранится в сессии"""
+    if 'master_id' not in session:
+        cursor.execute("SELECT id FROM masters WHERE master_login = ?", (session.get('user_login'),))
+        master = cursor.fetchone()
+        session['master_id'] = master[0] if master else None
+    return session['master_id']
 
 def handle_login_form():
     """Обработка данных входа из формы"""
@@ -649,8 +1007,7 @@ def handle_login_form():
         return render_login_page(error="Введите логин и пароль")
     
     try:
-        conn = sqlite3.connect('service_requests.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute("SELECT * FROM users WHERE login = ?", (login,))
@@ -661,64 +1018,68 @@ def handle_login_form():
             session['user_login'] = user['login']
             session['user_name'] = user['fio']
             session['user_type'] = user['user_type']
+            session.pop('master_id', None)
+            if user['user_type'] == 'master':
+                session_master_id(cursor)
             
-            conn.close()
             return render_main_page()
         else:
-            conn.close()
             return render_login_page(error="Неверный логин или пароль")
             
     except Exception as e:
         return render_login_page(error=f"Ошибка сервера: {str(e)}")
 
-def render_login_page(error=None):
-    """Рендеринг страницы входа с реальными паролями"""
-    error_html = f'''
-    <div style="background-color: #fee; color: #c00; padding: 10px; border-radius: 5px; margin-bottom: 20px; text-align: center;">
-        {error}
-    </div>
-    ''' if error else ''
-    
-    # Получаем список всех пользователей с реальными паролями из файла
-    try:
-        users_file_path = 'inputDataUsers.xlsx'
-        if os.path.exists(users_file_path):
-            df = pd.read_excel(users_file_path, sheet_name='Sheet1')
-            users_html = ""
-            for idx, row in df.iterrows():
-                login = row['login'] if pd.notna(row['login']) else f'user{idx+1}'
-                password = str(row['password']) if pd.notna(row['password']) else 'password123'
-                fio = row['fio'] if pd.notna(row['fio']) else f'Пользователь {idx+1}'
-                user_type_excel = row['type'] if pd.notna(row['type']) else 'Заказчик'
-                
-                users_html += f'''
-                <div class="account-item">
-                    <strong>{fio} ({user_type_excel}):</strong> {login} / <span style="color: #4f46e5; font-weight: bold;">{password}</span>
+# Строка списка учетных записей: логин, пароль, ФИО, тип, логин, пароль (значения экранированы)
+ACCOUNT_ITEM_TEMPLATE = '''
+                <div class="account-item" data-login="%s" data-password="%s">
+                    <strong>%s (%s):</strong> %s / <span style="color: #4f46e5; font-weight: bold;">%s</span>
                 </div>
                 '''
-        else:
-            # Если файл не найден, используем данные по умолчанию
-            users_html = '''
-            <div class="account-item"><strong>Администратор:</strong> admin / <span style="color: #4f46e5; font-weight: bold;">admin123</span></div>
-            <div class="account-item"><strong>Менеджер:</strong> kasoo / <span style="color: #4f46e5; font-weight: bold;">root</span></div>
-            <div class="account-item"><strong>Мастер:</strong> murashov123 / <span style="color: #4f46e5; font-weight: bold;">qwerty</span></div>
-            <div class="account-item"><strong>Оператор:</strong> perinaAD / <span style="color: #4f46e5; font-weight: bold;">250519</span></div>
-            <div class="account-item"><strong>Мастер:</strong> test1 / <span style="color: #4f46e5; font-weight: bold;">test1</span></div>
-            <div class="account-item"><strong>Заказчик:</strong> login2 / <span style="color: #4f46e5; font-weight: bold;">pass2</span></div>
-            <div class="account-item"><strong>Заказчик:</strong> login3 / <span style="color: #4f46e5; font-weight: bold;">pass3</span></div>
-            <div class="account-item"><strong>Заказчик:</strong> login4 / <span style="color: #4f46e5; font-weight: bold;">pass4</span></div>
-            <div class="account-item"><strong>Мастер:</strong> login5 / <span style="color: #4f46e5; font-weight: bold;">pass5</span></div>
-            '''
-    except Exception as e:
-        print(f"Ошибка при чтении файла пользователей: {e}")
-        users_html = '''
-        <div class="account-item"><strong>Администратор:</strong> admin / admin123</div>
-        <div class="account-item"><strong>Менеджер:</strong> kasoo / root</div>
-        <div class="account-item"><strong>Мастер:</strong> murashov123 / qwerty</div>
-        <div class="account-item"><strong>Оператор:</strong> perinaAD / 250519</div>
-        '''
+
+# Столбцы файла пользователей, которые показываются на странице входа
+USERS_LIST_COLUMNS = ('login', 'password', 'fio', 'type')
+
+# Кеш списка учетных записей: файл пользователей разбирается заново только после изменения
+_USERS_CACHE = {'mtime': None, 'html': None}
+
+def render_users_list(users_file_path):
+    """HTML списка учетных записей из Excel файла (с кешированием по времени изменения)"""
+    mtime = os.stat(users_file_path).st_mtime
+    if _USERS_CACHE['html'] is not None and _USERS_CACHE['mtime'] == mtime:
+        return _USERS_CACHE['html']
+    
+    # Небольшой справочник читаем напрямую из XML листа, без pandas и openpyxl
+    users_parts = []
+    idx = 0
+    for row in read_xlsx_rows(users_file_path, columns=USERS_LIST_COLUMNS):
+        # Пустые ячейки и отметки "null" сразу превращаем в пустые строки
+        login, password, fio, user_type_excel = (
+            '' if value is None or value in EXCEL_NA_VALUES else str(value)
+            for value in (row.get(name) for name in USERS_LIST_COLUMNS)
+        )
+        # Пропускаем пустые строки в конце листа
+        if not (login or password or fio or user_type_excel):
+            continue
+        
+        idx += 1
+        login = login or f'user{idx}'
+        password = password or 'password123'
+        fio = fio or f'Пользователь {idx}'
+        user_type_excel = user_type_excel or 'Заказчик'
+        
+        login, password, fio, user_type_excel = (
+            html.escape(value, quote=True) for value in (login, password, fio, user_type_excel)
+        )
+        users_parts.append(ACCOUNT_ITEM_TEMPLATE % (login, password, fio, user_type_excel, login, password))
     
-    login_html = f'''
+    users_html = ''.join(users_parts)
+    _USERS_CACHE['mtime'] = mtime
+    _USERS_CACHE['html'] = users_html
+    return users_html
+
+# Неизменные части страницы входа собираются один раз при загрузке модуля;
+# при каждом запросе подставляются только сообщение об ошибке и список учетных записей
+LOGIN_PAGE_HEAD = f'''
     <!DOCTYPE html>
     <html lang="ru">
     <head>
@@ -726,144 +1087,8 @@ def render_login_page(error=None):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Вход - Сервисный центр</title>
         <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-        <style>
-            :root {{
-                --primary-gradient: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                --secondary-gradient: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-                --accent-color: #4f46e5;
-                --bg-primary: #f8fafc;
-                --text-primary: #1e293b;
-                --text-secondary: #64748b;
-                --shadow-lg: 0 20px 25px -5px rgba(0,0,0,0.1);
-            }}
-            
-            * {{
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }}
-            
-            body {{
-                font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-                background: var(--primary-gradient);
-                min-height: 100vh;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                padding: 20px;
-            }}
-            
-            .login-container {{
-                width: 100%;
-                max-width: 500px;
-            }}
-            
-            .login-card {{
-                background: white;
-                border-radius: 20px;
-                padding: 40px;
-                box-shadow: var(--shadow-lg);
-                text-align: center;
-            }}
-            
-            .logo {{
-                width: 80px;
-                height: 80px;
-                margin: 0 auto 20px;
-                border-radius: 12px;
-                background: var(--secondary-gradient);
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                color: white;
-                font-size: 36px;
-            }}
-            
-            h1 {{
-                color: var(--text-primary);
-                margin-bottom: 10px;
-                font-size: 28px;
-            }}
-            
-            .subtitle {{
-                color: var(--text-secondary);
-                margin-bottom: 30px;
-                font-size: 14px;
-            }}
-            
-            .form-group {{
-                margin-bottom: 20px;
-                text-align: left;
-            }}
-            
-            label {{
-                display: block;
-                margin-bottom: 8px;
-                color: var(--text-primary);
-                font-weight: 500;
-            }}
-            
-            input {{
-                width: 100%;
-                padding: 14px 18px;
-                border: 2px solid #e2e8f0;
-                border-radius: 10px;
-                font-size: 16px;
-                transition: border-color 0.3s;
-            }}
-            
-            input:focus {{
-                outline: none;
-                border-color: var(--accent-color);
-            }}
-            
-            button {{
-                width: 100%;
-                padding: 14px;
-                background: var(--primary-gradient);
-                color: white;
-                border: none;
-                border-radius: 10px;
-                font-size: 16px;
-                font-weight: 600;
-                cursor: pointer;
-                transition: transform 0.2s;
-            }}
-            
-            button:hover {{
-                transform: translateY(-2px);
-            }}
-            
-            .test-accounts {{
-                margin-top: 30px;
-                padding: 20px;
-                background: #f1f5f9;
-                border-radius: 10px;
-                text-align: left;
-            }}
-            
-            .test-accounts h3 {{
-                margin-bottom: 10px;
-                font-size: 16px;
-            }}
-            
-            .account-item {{
-                margin-bottom: 8px;
-                font-size: 14px;
-                padding: 5px;
-                border-bottom: 1px solid #e2e8f0;
-                cursor: pointer;
-                transition: background 0.2s;
-            }}
-            
-            .account-item:hover {{
-                background: #e2e8f0;
-            }}
-            
-            .account-item:last-child {{
-                border-bottom: none;
-            }}
-        </style>
+        <link rel="stylesheet" href="{BASE_CSS_URL}">
+        <link rel="stylesheet" href="{LOGIN_CSS_URL}">
     </head>
     <body>
         <div class="login-container">
@@ -874,7 +1099,9 @@ def render_login_page(error=None):
                 <h1>Сервисный центр "БытСервис"</h1>
                 <p class="subtitle">Система учета заявок на ремонт бытовой техники</p>
                 
-                {error_html}
+                '''
+
+LOGIN_PAGE_MIDDLE = '''
                 
                 <form method="POST" action="/">
                     <div class="form-group">
@@ -892,7 +1119,9 @@ def render_login_page(error=None):
                 
                 <div class="test-accounts">
                     <h3>Тестовые учетные записи</h3>
-                    {users_html}
+                    '''
+
+LOGIN_PAGE_TAIL = f'''
                     <div style="margin-top: 10px; font-size: 12px; color: #666; font-style: italic;">
                         Для входа используйте логин и пароль из списка выше
                     </div>
@@ -900,41 +1129,182 @@ def render_login_page(error=None):
             </div>
         </div>
         
-        <script>
-            // Автозаполнение полей при клике на учетную запись
-            document.querySelectorAll('.account-item').forEach(item => {{
-                item.addEventListener('click', function() {{
-                    const text = this.textContent;
-                    const parts = text.split(':');
-                    if (parts.length > 1) {{
-                        const credentials = parts[1].trim().split('/');
-                        if (credentials.length === 2) {{
-                            const login = credentials[0].trim();
-                            const password = credentials[1].trim();
-                            
-                            // Удаляем HTML теги из пароля если они есть
-                            const cleanPassword = password.replace(/<[^>]*>/g, '').replace(/[^a-zA-Z0-9]/g, '');
-                            
-                            document.getElementById('login').value = login;
-                            document.getElementById('password').value = cleanPassword;
-                            
-                            // Подсвечиваем поля
-                            document.getElementById('login').style.borderColor = '#4f46e5';
-                            document.getElementById('password').style.borderColor = '#4f46e5';
-                            
-                            setTimeout(() => {{
-                                document.getElementById('login').style.borderColor = '';
-                                document.getElementById('password').style.borderColor = '';
-                            }}, 2000);
-                        }}
-                    }}
-                }});
-            }});
-        </script>
+        <script src="{LOGIN_JS_URL}"></script>
     </body>
     </html>
     '''
-    return login_html
+
+def collapse_indentation(markup):
+    """Удаление отступов и пустых строк из HTML разметки (выполняется один раз при загрузке)"""
+    return re.sub(r'\n\s+', '\n', markup)
+
+# Неизменные части без отступов кодируются в UTF-8 один раз, при запросе кодируются только вставки
+LOGIN_PAGE_HEAD_BYTES = collapse_indentation(LOGIN_PAGE_HEAD).encode('utf-8')
+LOGIN_PAGE_MIDDLE_BYTES = collapse_indentation(LOGIN_PAGE_MIDDLE).encode('utf-8')
+LOGIN_PAGE_TAIL_BYTES = collapse_indentation(LOGIN_PAGE_TAIL).encode('utf-8')
+
+# Версия неизменных частей страницы входа для ETag
+LOGIN_PAGE_HASH = hashlib.md5(LOGIN_PAGE_HEAD_BYTES + LOGIN_PAGE_MIDDLE_BYTES + LOGIN_PAGE_TAIL_BYTES).hexdigest()
+
+def login_page_response():
+    """Страница входа с ETag: браузер перепроверяет ее и получает 304, пока файл пользователей не изменился"""
+    try:
+        mtime = os.stat('inputDataUsers.xlsx').st_mtime
+    except FileNotFoundError:
+        mtime = 0
+    etag = hashlib.md5(f"{LOGIN_PAGE_HASH}|{mtime}".encode()).hexdigest()
+    
+    # При сжатии ответа ETag становится слабым (W/"..."), поэтому сравнение слабое
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(render_login_page())
+    
+    # По тому же адресу после входа отдается главная страница, поэтому без max-age:
+    # браузер каждый раз перепроверяет страницу по ETag
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+def json_response_with_etag(data, max_age=None):
+    """JSON ответ с ETag по содержимому: при совпадении If-None-Match отдается 304 без тела
+    
+    Без max_age браузер перепроверяет ответ при каждом запросе, с max_age - только по истечении срока.
+    """
+    response = jsonify(data)
+    response.add_etag()
+    response.cache_control.private = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def row_columns(cursor):
+    """Имена столбцов результата; дальше строки читаются кортежами, без объектов sqlite3.Row"""
+    cursor.row_factory = None
+    return [column[0] for column in cursor.description]
+
+def fetch_dicts(cursor):
+    """Все строки результата списком словарей"""
+    columns = row_columns(cursor)
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+# Число строк результата, сериализуемых за один шаг потоковой выдачи
+STREAM_BATCH_SIZE = 200
+
+def stream_json_rows(cursor):
+    """Потоковая выдача строк выполненного запроса JSON-массивом, без сборки всего списка в памяти"""
+    def generate():
+        columns = row_columns(cursor)
+        yield '['
+        separator = ''
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            yield separator + ','.join(app.json.dumps(dict(zip(columns, row)), separators=(',', ':')) for row in rows)
+            separator = ','
+        yield ']'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def load_users_html():
+    """Список всех пользователей с реальными паролями из файла (или учетные записи по умолчанию)"""
+    try:
+        # Файл открывается сразу, без отдельной проверки os.path.exists
+        users_html = render_users_list('inputDataUsers.xlsx')
+    except FileNotFoundError:
+        # Если файл не найден, используем данные по умолчанию
+        users_html = '''
+        <div class="account-item" data-login="admin" data-password="admin123"><strong>Администратор:</strong> admin / <span style="color: #4f46e5; font-weight: bold;">admin123</span></div>
+        <div class="account-item" data-login="kasoo" data-password="root"><strong>Менеджер:</strong> kasoo / <span style="color: #4f46e5; font-weight: bold;">root</span></div>
+        <div class="account-item" data-login="murashov123" data-password="qwerty"><strong>Мастер:</strong> murashov123 / <span style="color: #4f46e5; font-weight: bold;">qwerty</span></div>
+        <div class="account-item" data-login="perinaAD" data-password="250519"><strong>Оператор:</strong> perinaAD / <span style="color: #4f46e5; font-weight: bold;">250519</span></div>
+        <div class="account-item" data-login="test1" data-password="test1"><strong>Мастер:</strong> test1 / <span style="color: #4f46e5; font-weight: bold;">test1</span></div>
+        <div class="account-item" data-login="login2" data-password="pass2"><strong>Заказчик:</strong> login2 / <span style="color: #4f46e5; font-weight: bold;">pass2</span></div>
+        <div class="account-item" data-login="login3" data-password="pass3"><strong>Заказчик:</strong> login3 / <span style="color: #4f46e5; font-weight: bold;">pass3</span></div>
+        <div class="account-item" data-login="login4" data-password="pass4"><strong>Заказчик:</strong> login4 / <span style="color: #4f46e5; font-weight: bold;">pass4</span></div>
+        <div class="account-item" data-login="login5" data-password="pass5"><strong>Мастер:</strong> login5 / <span style="color: #4f46e5; font-weight: bold;">pass5</span></div>
+        '''
+    except Exception:
+        logger.exception("Ошибка при чтении файла пользователей")
+        users_html = '''
+        <div class="account-item" data-login="admin" data-password="admin123"><strong>Администратор:</strong> admin / admin123</div>
+        <div class="account-item" data-login="kasoo" data-password="root"><strong>Менеджер:</strong> kasoo / root</div>
+        <div class="account-item" data-login="murashov123" data-password="qwerty"><strong>Мастер:</strong> murashov123 / qwerty</div>
+        <div class="account-item" data-login="perinaAD" data-password="250519"><strong>Оператор:</strong> perinaAD / 250519</div>
+        '''
+        # Запасной список тоже кешируется, чтобы испорченный файл не разбирался
+        # и не попадал в журнал при каждом запросе
+        try:
+            _USERS_CACHE['mtime'] = os.stat('inputDataUsers.xlsx').st_mtime
+            _USERS_CACHE['html'] = users_html
+        except OSError:
+            pass
+    
+    return users_html
+
+def render_login_page(error=None):
+    """Рендеринг страницы входа с реальными паролями"""
+    error_html = f'''
+    <div style="background-color: #fee; color: #c00; padding: 10px; border-radius: 5px; margin-bottom: 20px; text-align: center;">
+        {html.escape(error)}
+    </div>
+    ''' if error else ''
+    
+    def generate():
+        # Заголовок страницы уходит клиенту сразу, и браузер начинает загружать стили,
+        # пока на сервере собирается список учетных записей
+        yield LOGIN_PAGE_HEAD_BYTES
+        yield error_html.encode('utf-8')
+        yield LOGIN_PAGE_MIDDLE_BYTES
+        yield load_users_html().encode('utf-8')
+        yield LOGIN_PAGE_TAIL_BYTES
+    
+    return app.response_class(generate(), mimetype='text/html')
+
+# Типы бытовой техники для формы новой заявки
+TECH_TYPES = [
+    'Фен', 'Тостер', 'Холодильник', 'Стиральная машина', 'Мультиварка', 'Телевизор', 'Пылесос',
+    'Микроволновая печь', 'Духовой шкаф', 'Посудомоечная машина', 'Кондиционер', 'Обогреватель', 'Другое'
+]
+TECH_TYPE_OPTIONS = '\n                                '.join(
+    ['<option value="">Выберите тип техники</option>'] +
+    [f'<option value="{html.escape(tech_type)}">{html.escape(tech_type)}</option>' for tech_type in TECH_TYPES]
+)
+
+# Права ролей на главной странице (роль -> набор флагов)
+Permissions = namedtuple('Permissions', [
+    'view_masters', 'create_requests', 'view_stats', 'assign_masters', 'edit_all', 'edit_own'
+])
+ROLE_PERMISSIONS = {
+    'admin': Permissions(True, True, True, True, True, False),
+    'manager': Permissions(True, True, True, True, True, False),
+    'operator': Permissions(True, True, True, True, True, False),
+    'master': Permissions(True, False, False, False, False, True),
+    'client': Permissions(False, True, False, False, False, False),
+}
+NO_PERMISSIONS = Permissions(False, False, False, False, False, False)
+
+HIDDEN_STYLE = 'style="display: none;"'
+
+REQUEST_ACTION_BUTTONS = {
+    'view': '<button class="action-btn btn-view" data-action="view">Просмотр</button>',
+    'assign': '<button class="action-btn btn-assign" data-action="assign">Назначить</button>',
+    'comment': '<button class="action-btn btn-comment" data-action="comment">Комментарий</button>',
+}
+
+def main_page_response():
+    """Главная страница с ETag по содержимому: неизмененная страница отдается ответом 304 без тела"""
+    response = make_response(render_main_page())
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
 
 def render_main_page():
     """Рендеринг главной страницы после входа"""
@@ -950,12 +1320,32 @@ def render_main_page():
     }
     user_type_display = user_type_names.get(user_type, user_type)
     
-    can_view_masters = user_type in ['admin', 'manager', 'master', 'operator']
-    can_create_requests = user_type in ['admin', 'manager', 'client', 'operator']
-    can_view_stats = user_type in ['admin', 'manager', 'operator']
-    can_assign_masters = user_type in ['admin', 'manager', 'operator']
-    can_edit_all = user_type in ['admin', 'manager', 'operator']
-    can_edit_own = user_type == 'master'
+    permissions = ROLE_PERMISSIONS.get(user_type, NO_PERMISSIONS)
+    
+    # Кнопки действий в строке заявки зависят только от роли, поэтому входят в шаблон строки
+    request_actions = [REQUEST_ACTION_BUTTONS['view']]
+    if permissions.assign_masters:
+        request_actions.append(REQUEST_ACTION_BUTTONS['assign'])
+    if permissions.edit_all or permissions.edit_own:
+        request_actions.append(REQUEST_ACTION_BUTTONS['comment'])
+    request_actions = ' '.join(request_actions)
+    
+    # Первая страница заявок встраивается в страницу, чтобы таблица отрисовалась без отдельного запроса
+    try:
+        initial_requests = fetch_dicts(select_requests_page(
+            get_db().cursor(), user_type, session.get('user_login'), REQUESTS_PAGE_SIZE
+        ))
+    except Exception:
+        logger.exception("Ошибка при получении первой страницы заявок")
+        initial_requests = None
+    # Данные для скрипта страницы; "<" экранируется, чтобы данные не могли закрыть тег <script>
+    initial_requests_json = json.dumps(initial_requests, ensure_ascii=False).replace('<', '\\u003c')
+    page_context_json = json.dumps({
+        'userType': user_type,
+        'userName': user_name,
+        'canAssignMasters': permissions.assign_masters,
+        'requestsPageSize': REQUESTS_PAGE_SIZE
+    }, ensure_ascii=False).replace('<', '\\u003c')
     
     main_html = f'''
     <!DOCTYPE html>
@@ -964,328 +1354,9 @@ def render_main_page():
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Сервисный центр - Учет заявок</title>
-        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
         <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-        <style>
-            :root {{
-                --primary-gradient: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                --secondary-gradient: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-                --accent-color: #4f46e5;
-                --bg-primary: #f8fafc;
-                --bg-card: #ffffff;
-                --text-primary: #1e293b;
-                --text-secondary: #64748b;
-                --border-color: #e2e8f0;
-                --shadow-md: 0 4px 6px -1px rgba(0,0,0,0.1);
-            }}
-            
-            * {{
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }}
-            
-            body {{
-                font-family: 'Inter', sans-serif;
-                background-color: var(--bg-primary);
-                color: var(--text-primary);
-            }}
-            
-            .container {{
-                max-width: 1200px;
-                margin: 0 auto;
-                padding: 20px;
-            }}
-            
-            .header {{
-                background: var(--primary-gradient);
-                color: white;
-                padding: 20px 30px;
-                border-radius: 15px;
-                margin-bottom: 30px;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-            }}
-            
-            .user-info {{
-                display: flex;
-                align-items: center;
-                gap: 15px;
-            }}
-            
-            .user-avatar {{
-                width: 40px;
-                height: 40px;
-                background: var(--secondary-gradient);
-                border-radius: 50%;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                color: white;
-                font-weight: bold;
-            }}
-            
-            .nav-cards {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-                gap: 20px;
-                margin-bottom: 30px;
-            }}
-            
-            .nav-card {{
-                background: var(--bg-card);
-                padding: 25px;
-                border-radius: 12px;
-                border: 1px solid var(--border-color);
-                cursor: pointer;
-                transition: all 0.3s;
-            }}
-            
-            .nav-card:hover {{
-                transform: translateY(-5px);
-                box-shadow: var(--shadow-md);
-            }}
-            
-            .nav-card-icon {{
-                font-size: 36px;
-                margin-bottom: 15px;
-                color: var(--accent-color);
-            }}
-            
-            .content-section {{
-                background: var(--bg-card);
-                padding: 30px;
-                border-radius: 12px;
-                border: 1px solid var(--border-color);
-                margin-bottom: 30px;
-                display: none;
-            }}
-            
-            .content-section.active {{
-                display: block;
-            }}
-            
-            .table-container {{
-                overflow-x: auto;
-                margin-top: 20px;
-            }}
-            
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-            }}
-            
-            th, td {{
-                padding: 12px 15px;
-                text-align: left;
-                border-bottom: 1px solid var(--border-color);
-            }}
-            
-            th {{
-                background-color: #f8fafc;
-                font-weight: 600;
-            }}
-            
-            .badge {{
-                padding: 5px 10px;
-                border-radius: 15px;
-                font-size: 12px;
-                font-weight: 600;
-            }}
-            
-            .badge-new {{ background: #dbeafe; color: #1e40af; }}
-            .badge-process {{ background: #fef3c7; color: #92400e; }}
-            .badge-completed {{ background: #d1fae5; color: #065f46; }}
-            .badge-waiting {{ background: #f3e8ff; color: #6b21a8; }}
-            
-            .logout-btn {{
-                padding: 8px 16px;
-                background: rgba(255,255,255,0.2);
-                border: none;
-                color: white;
-                border-radius: 8px;
-                cursor: pointer;
-            }}
-            
-            .logout-btn:hover {{
-                background: rgba(255,255,255,0.3);
-            }}
-            
-            .action-btn {{
-                padding: 5px 10px;
-                margin: 2px;
-                border: none;
-                border-radius: 5px;
-                cursor: pointer;
-                font-size: 12px;
-            }}
-            
-            .btn-view {{ background: #dbeafe; color: #1e40af; }}
-            .btn-edit {{ background: #fef3c7; color: #92400e; }}
-            .btn-assign {{ background: #dcfce7; color: #166534; }}
-            .btn-comment {{ background: #e0e7ff; color: #3730a3; }}
-            
-            /* Модальное окно */
-            .modal {{
-                display: none;
-                position: fixed;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                background: rgba(0,0,0,0.5);
-                z-index: 1000;
-                align-items: center;
-                justify-content: center;
-            }}
-            
-            .modal-content {{
-                background: white;
-                padding: 30px;
-                border-radius: 10px;
-                min-width: 300px;
-                max-width: 800px;
-                max-height: 80vh;
-                overflow-y: auto;
-            }}
-            
-            .modal-header {{
-                margin-bottom: 20px;
-                border-bottom: 1px solid var(--border-color);
-                padding-bottom: 10px;
-            }}
-            
-            .modal-footer {{
-                margin-top: 20px;
-                text-align: right;
-                border-top: 1px solid var(--border-color);
-                padding-top: 10px;
-            }}
-            
-            .modal-btn {{
-                padding: 8px 16px;
-                border: none;
-                border-radius: 5px;
-                cursor: pointer;
-                margin-left: 10px;
-            }}
-            
-            .modal-btn-primary {{
-                background: var(--accent-color);
-                color: white;
-            }}
-            
-            .modal-btn-secondary {{
-                background: #ccc;
-                color: black;
-            }}
-            
-            .master-list {{
-                max-height: 300px;
-                overflow-y: auto;
-                border: 1px solid var(--border-color);
-                border-radius: 5px;
-                padding: 10px;
-            }}
-            
-            .master-item {{
-                padding: 10px;
-                border-bottom: 1px solid var(--border-color);
-                cursor: pointer;
-                transition: background 0.2s;
-            }}
-            
-            .master-item:hover {{
-                background: #f8fafc;
-            }}
-            
-            .master-item.selected {{
-                background: #e0e7ff;
-                border-left: 4px solid var(--accent-color);
-            }}
-            
-            .comments-section {{
-                margin-top: 20px;
-                border-top: 1px solid var(--border-color);
-                padding-top: 20px;
-            }}
-            
-            .comment-item {{
-                background: #f8fafc;
-                padding: 15px;
-                margin-bottom: 10px;
-                border-radius: 5px;
-                border-left: 3px solid var(--accent-color);
-            }}
-            
-            .comment-header {{
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                margin-bottom: 8px;
-            }}
-            
-            .comment-author {{
-                font-weight: bold;
-                color: var(--text-primary);
-            }}
-            
-            .comment-user-type {{
-                font-size: 12px;
-                color: var(--text-secondary);
-                background: #e2e8f0;
-                padding: 2px 8px;
-                border-radius: 10px;
-                margin-left: 10px;
-            }}
-            
-            .comment-date {{
-                font-size: 12px;
-                color: var(--text-secondary);
-            }}
-            
-            .comment-message {{
-                margin-top: 5px;
-                line-height: 1.5;
-            }}
-            
-            .comment-source {{
-                font-size: 10px;
-                color: #94a3b8;
-                margin-top: 5px;
-                font-style: italic;
-            }}
-            
-            .comment-from-file {{
-                border-left-color: #10b981;
-            }}
-            
-            .comment-from-system {{
-                border-left-color: #3b82f6;
-            }}
-            
-            .template-comment-item:hover {{
-                background: #f1f5f9;
-                border-color: #cbd5e1;
-            }}
-            
-            .template-comment-item.selected {{
-                background: #e0e7ff !important;
-                border-color: #4f46e5 !important;
-            }}
-            
-            .comment-template-list {{
-                display: grid;
-                gap: 8px;
-                max-height: 200px;
-                overflow-y: auto;
-                padding: 10px;
-                background: #f8fafc;
-                border-radius: 8px;
-                border: 1px solid #e2e8f0;
-            }}
-        </style>
+        <link rel="stylesheet" href="{BASE_CSS_URL}">
+        <link rel="stylesheet" href="{MAIN_CSS_URL}">
     </head>
     <body>
         <div class="container">
@@ -1311,19 +1382,19 @@ def render_main_page():
                     <p>Просмотр и управление заявками</p>
                 </div>
                 
-                <div class="nav-card" onclick="showSection('new-request')" {'' if can_create_requests else 'style="display: none;"'}>
+                <div class="nav-card" onclick="showSection('new-request')" {'' if permissions.create_requests else HIDDEN_STYLE}>
                     <div class="nav-card-icon"><i class="fas fa-plus-circle"></i></div>
                     <h3>Новая заявка</h3>
                     <p>Создание новой заявки на ремонт</p>
                 </div>
                 
-                <div class="nav-card" onclick="showSection('stats')" {'' if can_view_stats else 'style="display: none;"'}>
+                <div class="nav-card" onclick="showSection('stats')" {'' if permissions.view_stats else HIDDEN_STYLE}>
                     <div class="nav-card-icon"><i class="fas fa-chart-bar"></i></div>
                     <h3>Статистика</h3>
                     <p>Аналитика и отчетность</p>
                 </div>
                 
-                <div class="nav-card" onclick="showSection('masters')" {'' if can_view_masters else 'style="display: none;"'}>
+                <div class="nav-card" onclick="showSection('masters')" {'' if permissions.view_masters else HIDDEN_STYLE}>
                     <div class="nav-card-icon"><i class="fas fa-users"></i></div>
                     <h3>Мастера</h3>
                     <p>Управление мастерами</p>
@@ -1342,7 +1413,7 @@ def render_main_page():
                 <div>
                     <input type="text" id="searchInput" placeholder="Поиск по номеру, клиенту, описанию..." 
                            style="width: 100%; padding: 10px; margin-bottom: 20px;"
-                           onkeyup="searchRequests()">
+                           oninput="onSearchInput()">
                     <div class="table-container">
                         <table id="requestsTable">
                             <thead>
@@ -1363,6 +1434,20 @@ def render_main_page():
                                 <tr><td colspan="10">Загрузка...</td></tr>
                             </tbody>
                         </table>
+                        <template id="requestRowTemplate">
+                            <tr>
+                                <td></td>
+                                <td></td>
+                                <td></td>
+                                <td></td>
+                                <td></td>
+                                <td><span></span><br><small></small></td>
+                                <td><span class="badge"></span></td>
+                                <td></td>
+                                <td></td>
+                                <td>{request_actions}</td>
+                            </tr>
+                        </template>
                     </div>
                 </div>
             </section>
@@ -1375,20 +1460,7 @@ def render_main_page():
                         <div>
                             <label>Тип бытовой техники *</label>
                             <select id="tech_type" required style="width: 100%; padding: 10px;">
-                                <option value="">Выберите тип техники</option>
-                                <option value="Фен">Фен</option>
-                                <option value="Тостер">Тостер</option>
-                                <option value="Холодильник">Холодильник</option>
-                                <option value="Стиральная машина">Стиральная машина</option>
-                                <option value="Мультиварка">Мультиварка</option>
-                                <option value="Телевизор">Телевизор</option>
-                                <option value="Пылесос">Пылесос</option>
-                                <option value="Микроволновая печь">Микроволновая печь</option>
-                                <option value="Духовой шкаф">Духовой шкаф</option>
-                                <option value="Посудомоечная машина">Посудомоечная машина</option>
-                                <option value="Кондиционер">Кондиционер</option>
-                                <option value="Обогреватель">Обогреватель</option>
-                                <option value="Другое">Другое</option>
+                                {TECH_TYPE_OPTIONS}
                             </select>
                         </div>
                         <div>
@@ -1426,94 +1498,100 @@ def render_main_page():
             <!-- Секция статистики -->
             <section id="stats" class="content-section">
                 <h2>Статистика работы отдела обслуживания</h2>
-                <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin: 20px 0;">
-                    <div style="background: #f8fafc; padding: 20px; border-radius: 10px; text-align: center;">
-                        <div style="font-size: 32px; font-weight: bold; color: var(--accent-color);" id="totalRequests">0</div>
-                        <div>Всего заявок</div>
-                    </div>
-                    <div style="background: #f8fafc; padding: 20px; border-radius: 10px; text-align: center;">
-                        <div style="font-size: 32px; font-weight: bold; color: #10b981;" id="completedRequests">0</div>
-                        <div>Выполнено</div>
-                    </div>
-                    <div style="background: #f8fafc; padding: 20px; border-radius: 10px; text-align: center;">
-                        <div style="font-size: 32px; font-weight: bold; color: #f59e0b;" id="avgTime">0</div>
-                        <div>Среднее время (дней)</div>
-                    </div>
-                    <div style="background: #f8fafc; padding: 20px; border-radius: 10px; text-align: center;">
-                        <div style="font-size: 32px; font-weight: bold; color: #8b5cf6;" id="inProcess">0</div>
-                        <div>В процессе</div>
-                    </div>
-                </div>
-                <div style="display: flex; gap: 20px; flex-wrap: wrap;">
-                    <div style="flex: 1; min-width: 300px;">
-                        <canvas id="statusChart" style="max-width: 100%;"></canvas>
+                <template class="lazy-section">
+                    <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin: 20px 0;">
+                        <div style="background: #f8fafc; padding: 20px; border-radius: 10px; text-align: center;">
+                            <div style="font-size: 32px; font-weight: bold; color: var(--accent-color);" id="totalRequests">0</div>
+                            <div>Всего заявок</div>
+                        </div>
+                        <div style="background: #f8fafc; padding: 20px; border-radius: 10px; text-align: center;">
+                            <div style="font-size: 32px; font-weight: bold; color: #10b981;" id="completedRequests">0</div>
+                            <div>Выполнено</div>
+                        </div>
+                        <div style="background: #f8fafc; padding: 20px; border-radius: 10px; text-align: center;">
+                            <div style="font-size: 32px; font-weight: bold; color: #f59e0b;" id="avgTime">0</div>
+                            <div>Среднее время (дней)</div>
+                        </div>
+                        <div style="background: #f8fafc; padding: 20px; border-radius: 10px; text-align: center;">
+                            <div style="font-size: 32px; font-weight: bold; color: #8b5cf6;" id="inProcess">0</div>
+                            <div>В процессе</div>
+                        </div>
                     </div>
-                    <div style="flex: 1; min-width: 300px;">
-                        <canvas id="typeChart" style="max-width: 100%;"></canvas>
+                    <div style="display: flex; gap: 20px; flex-wrap: wrap;">
+                        <div style="flex: 1; min-width: 300px;">
+                            <canvas id="statusChart" style="max-width: 100%;"></canvas>
+                        </div>
+                        <div style="flex: 1; min-width: 300px;">
+                            <canvas id="typeChart" style="max-width: 100%;"></canvas>
+                        </div>
                     </div>
-                </div>
-                <div style="margin-top: 30px;">
-                    <h3>Статистика по типам неисправностей</h3>
-                    <div id="problemStats" style="margin-top: 10px;">
-                        <!-- Статистика будет загружена здесь -->
+                    <div style="margin-top: 30px;">
+                        <h3>Статистика по типам неисправностей</h3>
+                        <div id="problemStats" style="margin-top: 10px;">
+                            <!-- Статистика будет загружена здесь -->
+                        </div>
                     </div>
-                </div>
+                </template>
             </section>
             
             <!-- Секция мастеров -->
             <section id="masters" class="content-section">
                 <h2>Мастера</h2>
-                <div class="table-container">
-                    <table>
-                        <thead>
-                            <tr>
-                                <th>ФИО</th>
-                                <th>Телефон</th>
-                                <th>Логин</th>
-                                <th>Тип</th>
-                                <th>Заявок в работе</th>
-                                <th>Всего заявок</th>
-                                <th>Комментариев</th>
-                            </tr>
-                        </thead>
-                        <tbody id="mastersTableBody">
-                            <tr><td colspan="7">Загрузка...</td></tr>
-                        </tbody>
-                    </table>
-                </div>
+                <template class="lazy-section">
+                    <div class="table-container">
+                        <table>
+                            <thead>
+                                <tr>
+                                    <th>ФИО</th>
+                                    <th>Телефон</th>
+                                    <th>Логин</th>
+                                    <th>Тип</th>
+                                    <th>Заявок в работе</th>
+                                    <th>Всего заявок</th>
+                                    <th>Комментариев</th>
+                                </tr>
+                            </thead>
+                            <tbody id="mastersTableBody">
+                                <tr><td colspan="7">Загрузка...</td></tr>
+                            </tbody>
+                        </table>
+                    </div>
+                </template>
             </section>
             
             <!-- Секция комментариев -->
             <section id="comments" class="content-section">
                 <h2>Все комментарии из файла и системы</h2>
-                <div class="table-container">
-                    <table>
-                        <thead>
-                            <tr>
-                                <th>ID</th>
-                                <th>Заявка</th>
-                                <th>Автор</th>
-                                <th>Тип автора</th>
-                                <th>Комментарий</th>
-                                <th>Дата</th>
-                                <th>Источник</th>
-                            </tr>
-                        </thead>
-                        <tbody id="commentsTableBody">
-                            <tr><td colspan="7">Загрузка...</td></tr>
-                        </tbody>
-                    </table>
-                </div>
-                <div style="margin-top: 20px; display: flex; gap: 10px;">
-                    <div style="display: flex; align-items: center;">
-                        <div style="width: 15px; height: 15px; background-color: #10b981; margin-right: 5px;"></div>
-                        <span>Комментарии из файла</span>
+                <template class="lazy-section">
+                    <div class="table-container">
+                        <table>
+                            <thead>
+                                <tr>
+                                    <th>ID</th>
+                                    <th>Заявка</th>
+                                    <th>Автор</th>
+                                    <th>Тип автора</th>
+                                    <th>Комментарий</th>
+                                    <th>Дата</th>
+                                    <th>Источник</th>
+                                </tr>
+                            </thead>
+                            <tbody id="commentsTableBody">
+                                <tr><td colspan="7">Загрузка...</td></tr>
+                            </tbody>
+                        </table>
                     </div>
-                    <div style="display: flex; align-items: center;">
-                        <div style="width: 15px; height: 15px; background-color: #3b82f6; margin-right: 5px;"></div>
-                        <span>Комментарии из системы</span>
+                    <div style="margin-top: 20px; display: flex; gap: 10px;">
+                        <div style="display: flex; align-items: center;">
+                            <div style="width: 15px; height: 15px; background-color: #10b981; margin-right: 5px;"></div>
+                            <span>Комментарии из файла</span>
+                        </div>
+                        <div style="display: flex; align-items: center;">
+                            <div style="width: 15px; height: 15px; background-color: #3b82f6; margin-right: 5px;"></div>
+                            <span>Комментарии из системы</span>
+                        </div>
                     </div>
-                </div>
+                </template>
             </section>
         </div>
         
@@ -1545,6 +1623,19 @@ def render_main_page():
                 <div id="viewRequestBody">
                     <!-- Информация о заявке и комментарии будут загружены здесь -->
                 </div>
+                <template id="commentItemTemplate">
+                    <div class="comment-item">
+                        <div class="comment-header">
+                            <div>
+                                <span class="comment-author"></span>
+                                <span class="comment-user-type"></span>
+                            </div>
+                            <div class="comment-date"></div>
+                        </div>
+                        <div class="comment-message"></div>
+                        <div class="comment-source"></div>
+                    </div>
+                </template>
                 <div class="modal-footer">
                     <button class="modal-btn modal-btn-secondary" onclick="closeViewRequestModal()">Закрыть</button>
                 </div>
@@ -1590,734 +1681,9 @@ def render_main_page():
             </div>
         </div>
         
-        <script>
-            let currentAssignRequestId = null;
-            let selectedMasterId = null;
-            let currentEditRequestId = null;
-            let currentCommentRequestId = null;
-            let currentViewRequestId = null;
-            
-            // Показ секций
-            function showSection(sectionId) {{
-                document.querySelectorAll('.content-section').forEach(section => {{
-                    section.classList.remove('active');
-                }});
-                document.getElementById(sectionId).classList.add('active');
-                
-                // Загрузка данных для секции
-                if (sectionId === 'requests') loadRequests();
-                if (sectionId === 'stats') loadStats();
-                if (sectionId === 'masters') loadMasters();
-                if (sectionId === 'comments') loadComments();
-            }}
-            
-            // Загрузка заявок
-            async function loadRequests() {{
-                try {{
-                    const response = await fetch('/api/requests');
-                    const requests = await response.json();
-                    
-                    const tbody = document.getElementById('requestsTableBody');
-                    tbody.innerHTML = '';
-                    
-                    if (requests.length === 0) {{
-                        tbody.innerHTML = '<tr><td colspan="10" style="text-align: center; padding: 20px;">Нет заявок</td></tr>';
-                        return;
-                    }}
-                    
-                    for (const request of requests) {{
-                        const row = document.createElement('tr');
-                        const statusClass = {{
-                            'Новая заявка': 'badge-new',
-                            'В процессе ремонта': 'badge-process',
-                            'Готова к выдаче': 'badge-completed',
-                            'Завершена': 'badge-completed',
-                            'Ожидание запчастей': 'badge-waiting'
-                        }}[request.request_status] || 'badge-new';
-                        
-                        let actionButtons = '';
-                        const userType = '{user_type}';
-                        
-                        // Получаем количество комментариев для этой заявки
-                        const commentCount = request.has_comment ? await getCommentCount(request.request_id) : 0;
-                        
-                        if (userType === 'admin' || userType === 'manager' || userType === 'operator') {{
-                            actionButtons = `
-                                <button class="action-btn btn-view" onclick="viewRequestDetails(${{request.request_id}})">Просмотр</button>
-                                <button class="action-btn btn-assign" onclick="openAssignMasterModal(${{request.request_id}})">Назначить</button>
-                                <button class="action-btn btn-comment" onclick="openAddCommentModal(${{request.request_id}})">Комментарий</button>
-                            `;
-                        }} else if (userType === 'master') {{
-                            actionButtons = `
-                                <button class="action-btn btn-view" onclick="viewRequestDetails(${{request.request_id}})">Просмотр</button>
-                                <button class="action-btn btn-comment" onclick="openAddCommentModal(${{request.request_id}})">Комментарий</button>
-                            `;
-                        }} else {{
-                            actionButtons = `
-                                <button class="action-btn btn-view" onclick="viewRequestDetails(${{request.request_id}})">Просмотр</button>
-                            `;
-                        }}
-                        
-                        row.innerHTML = `
-                            <td>${{request.request_id}}</td>
-                            <td>${{new Date(request.start_date).toLocaleDateString('ru-RU')}}</td>
-                            <td>${{request.tech_type}}</td>
-                            <td>${{request.tech_model}}</td>
-                            <td>${{request.problem_description}}</td>
-                            <td>${{request.client_fio}}<br><small>${{request.client_phone}}</small></td>
-                            <td><span class="badge ${{statusClass}}">${{request.request_status}}</span></td>
-                            <td>${{request.master_fio || 'Не назначен'}}</td>
-                            <td>${{commentCount > 0 ? commentCount + ' комментариев' : 'Нет'}}</td>
-                            <td>${{actionButtons}}</td>
-                        `;
-                        tbody.appendChild(row);
-                    }}
-                }} catch (error) {{
-                    console.error('Ошибка загрузки заявок:', error);
-                    document.getElementById('requestsTableBody').innerHTML = '<tr><td colspan="10" style="text-align: center; color: red;">Ошибка загрузки данных</td></tr>';
-                }}
-            }}
-            
-            // Получение количества комментариев для заявки
-            async function getCommentCount(requestId) {{
-                try {{
-                    const response = await fetch('/api/comments/request/' + requestId);
-                    const comments = await response.json();
-                    return comments.length;
-                }} catch (error) {{
-                    return 0;
-                }}
-            }}
-            
-            // Поиск заявок
-            async function searchRequests() {{
-                const query = document.getElementById('searchInput').value;
-                if (query.length < 2 && query.length > 0) return;
-                
-                try {{
-                    const response = await fetch('/api/requests/search?q=' + encodeURIComponent(query));
-                    const requests = await response.json();
-                    
-                    const tbody = document.getElementById('requestsTableBody');
-                    tbody.innerHTML = '';
-                    
-                    if (requests.length === 0) {{
-                        tbody.innerHTML = '<tr><td colspan="10" style="text-align: center; padding: 20px;">Ничего не найдено</td></tr>';
-                        return;
-                    }}
-                    
-                    for (const request of requests) {{
-                        const row = document.createElement('tr');
-                        const statusClass = {{
-                            'Новая заявка': 'badge-new',
-                            'В процессе ремонта': 'badge-process',
-                            'Готова к выдаче': 'badge-completed',
-                            'Завершена': 'badge-completed',
-                            'Ожидание запчастей': 'badge-waiting'
-                        }}[request.request_status] || 'badge-new';
-                        
-                        let actionButtons = '';
-                        const userType = '{user_type}';
-                        
-                        // Получаем количество комментариев для этой заявки
-                        const commentCount = request.has_comment ? await getCommentCount(request.request_id) : 0;
-                        
-                        if (userType === 'admin' || userType === 'manager' || userType === 'operator') {{
-                            actionButtons = `
-                                <button class="action-btn btn-view" onclick="viewRequestDetails(${{request.request_id}})">Просмотр</button>
-                                <button class="action-btn btn-assign" onclick="openAssignMasterModal(${{request.request_id}})">Назначить</button>
-                                <button class="action-btn btn-comment" onclick="openAddCommentModal(${{request.request_id}})">Комментарий</button>
-                            `;
-                        }} else if (userType === 'master') {{
-                            actionButtons = `
-                                <button class="action-btn btn-view" onclick="viewRequestDetails(${{request.request_id}})">Просмотр</button>
-                                <button class="action-btn btn-comment" onclick="openAddCommentModal(${{request.request_id}})">Комментарий</button>
-                            `;
-                        }} else {{
-                            actionButtons = `
-                                <button class="action-btn btn-view" onclick="viewRequestDetails(${{request.request_id}})">Просмотр</button>
-                            `;
-                        }}
-                        
-                        row.innerHTML = `
-                            <td>${{request.request_id}}</td>
-                            <td>${{new Date(request.start_date).toLocaleDateString('ru-RU')}}</td>
-                            <td>${{request.tech_type}}</td>
-                            <td>${{request.tech_model}}</td>
-                            <td>${{request.problem_description}}</td>
-                            <td>${{request.client_fio}}<br><small>${{request.client_phone}}</small></td>
-                            <td><span class="badge ${{statusClass}}">${{request.request_status}}</span></td>
-                            <td>${{request.master_fio || 'Не назначен'}}</td>
-                            <td>${{commentCount > 0 ? commentCount + ' комментариев' : 'Нет'}}</td>
-                            <td>${{actionButtons}}</td>
-                        `;
-                        tbody.appendChild(row);
-                    }}
-                }} catch (error) {{
-                    console.error('Ошибка поиска:', error);
-                }}
-            }}
-            
-            // Загрузка шаблонов комментариев
-            async function loadTemplateComments() {{
-                try {{
-                    const response = await fetch('/api/template_comments');
-                    const templateComments = await response.json();
-                    
-                    const container = document.getElementById('templateComments');
-                    container.innerHTML = '';
-                    
-                    if (templateComments.length === 0) {{
-                        container.innerHTML = '<div style="text-align: center; color: #666; padding: 20px;">Нет доступных шаблонов комментариев</div>';
-                        return;
-                    }}
-                    
-                    templateComments.forEach((comment, index) => {{
-                        const commentItem = document.createElement('div');
-                        commentItem.className = 'template-comment-item';
-                        commentItem.style.cssText = `
-                            padding: 8px 12px;
-                            background: #f8fafc;
-                            border: 1px solid #e2e8f0;
-                            border-radius: 5px;
-                            cursor: pointer;
-                            font-size: 14px;
-                            transition: all 0.2s;
-                            margin-bottom: 5px;
-                        `;
-                        
-                        commentItem.innerHTML = `
-                            <div style="display: flex; justify-content: space-between; align-items: center;">
-                                <span>${{comment}}</span>
-                                <i class="fas fa-plus" style="color: #4f46e5; font-size: 12px;"></i>
-                            </div>
-                        `;
-                        
-                        commentItem.onclick = () => {{
-                            // Выделяем выбранный шаблон
-                            document.querySelectorAll('.template-comment-item').forEach(item => {{
-                                item.style.background = '#f8fafc';
-                                item.style.borderColor = '#e2e8f0';
-                            }});
-                            
-                            commentItem.style.background = '#e0e7ff';
-                            commentItem.style.borderColor = '#4f46e5';
-                            
-                            // Вставляем текст в поле
-                            document.getElementById('commentMessage').value = comment;
-                        }};
-                        
-                        commentItem.onmouseover = () => {{
-                            if (commentItem.style.background !== '#e0e7ff') {{
-                                commentItem.style.background = '#f1f5f9';
-                            }}
-                        }};
-                        
-                        commentItem.onmouseout = () => {{
-                            if (commentItem.style.background !== '#e0e7ff') {{
-                                commentItem.style.background = '#f8fafc';
-                            }}
-                        }};
-                        
-                        container.appendChild(commentItem);
-                    }});
-                    
-                }} catch (error) {{
-                    console.error('Ошибка загрузки шаблонов комментариев:', error);
-                }}
-            }}
-            
-            // Очистка комментария
-            function clearComment() {{
-                document.getElementById('commentMessage').value = '';
-                document.querySelectorAll('.template-comment-item').forEach(item => {{
-                    item.style.background = '#f8fafc';
-                    item.style.borderColor = '#e2e8f0';
-                }});
-            }}
-            
-            // Просмотр деталей заявки с комментариями
-            async function viewRequestDetails(requestId) {{
-                currentViewRequestId = requestId;
-                
-                try {{
-                    const response = await fetch('/api/requests/' + requestId);
-                    const requestData = await response.json();
-                    
-                    // Загружаем комментарии для этой заявки
-                    const commentsResponse = await fetch('/api/comments/request/' + requestId);
-                    const comments = await commentsResponse.json();
-                    
-                    document.getElementById('viewRequestTitle').textContent = `Заявка №${{requestId}}`;
-                    
-                    let masterInfo = 'Не назначен';
-                    if (requestData.master_fio) {{
-                        masterInfo = `${{requestData.master_fio}} (${{requestData.master_phone}})`;
-                    }}
-                    
-                    let partsInfo = 'Не указаны';
-                    if (requestData.repair_parts) {{
-                        partsInfo = requestData.repair_parts;
-                    }}
-                    
-                    let commentsHtml = '<h3>Комментарии:</h3>';
-                    if (comments.length === 0) {{
-                        commentsHtml += '<p>Нет комментариев</p>';
-                    }} else {{
-                        // Сортируем комментарии по дате (новые сверху)
-                        comments.sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
-                        
-                        comments.forEach(comment => {{
-                            const sourceClass = comment.comment_id ? 'comment-from-file' : 'comment-from-system';
-                            const sourceText = comment.comment_id ? 'Из файла' : 'Из системы';
-                            const userTypeDisplay = {{
-                                'admin': 'Администратор',
-                                'manager': 'Менеджер',
-                                'master': 'Мастер',
-                                'operator': 'Оператор',
-                                'client': 'Заказчик'
-                            }}[comment.user_type] || comment.user_type;
-                            
-                            commentsHtml += `
-                                <div class="comment-item ${{sourceClass}}">
-                                    <div class="comment-header">
-                                        <div>
-                                            <span class="comment-author">${{comment.user_fio || 'Неизвестный автор'}}</span>
-                                            <span class="comment-user-type">${{userTypeDisplay}}</span>
-                                        </div>
-                                        <div class="comment-date">${{new Date(comment.created_at).toLocaleString('ru-RU')}}</div>
-                                    </div>
-                                    <div class="comment-message">${{comment.message}}</div>
-                                    <div class="comment-source">Источник: ${{sourceText}}</div>
-                                </div>
-                            `;
-                        }});
-                    }}
-                    
-                    // Добавляем кнопку для добавления комментария, если у пользователя есть права
-                    let addCommentButton = '';
-                    const userType = '{user_type}';
-                    if (userType !== 'client') {{
-                        addCommentButton = `
-                            <div style="margin-top: 20px; border-top: 1px solid var(--border-color); padding-top: 20px;">
-                                <button onclick="openAddCommentModal(${{requestId}})" style="padding: 10px 20px; background: var(--accent-color); color: white; border: none; border-radius: 5px; cursor: pointer;">
-                                    <i class="fas fa-plus"></i> Добавить комментарий
-                                </button>
-                            </div>
-                        `;
-                    }}
-                    
-                    const modalBody = `
-                        <div style="padding: 20px;">
-                            <p><strong>Дата создания:</strong> ${{new Date(requestData.start_date).toLocaleDateString('ru-RU')}}</p>
-                            <p><strong>Тип техники:</strong> ${{requestData.tech_type}}</p>
-                            <p><strong>Модель:</strong> ${{requestData.tech_model}}</p>
-                            <p><strong>Проблема:</strong> ${{requestData.problem_description}}</p>
-                            <p><strong>Клиент:</strong> ${{requestData.client_fio}} (${{requestData.client_phone}})</p>
-                            <p><strong>Статус:</strong> ${{requestData.request_status}}</p>
-                            <p><strong>Мастер:</strong> ${{masterInfo}}</p>
-                            <p><strong>Запасные части:</strong> ${{partsInfo}}</p>
-                            ${{requestData.completion_date ? 
-                                '<p><strong>Дата завершения:</strong> ' + new Date(requestData.completion_date).toLocaleDateString('ru-RU') + '</p>' : ''}}
-                            <div class="comments-section">
-                                ${{commentsHtml}}
-                            </div>
-                            ${{addCommentButton}}
-                        </div>
-                    `;
-                    
-                    document.getElementById('viewRequestBody').innerHTML = modalBody;
-                    document.getElementById('viewRequestModal').style.display = 'flex';
-                    
-                }} catch (error) {{
-                    console.error('Ошибка загрузки данных заявки:', error);
-                    alert('Ошибка загрузки данных заявки');
-                }}
-            }}
-            
-            // Закрытие модального окна просмотра заявки
-            function closeViewRequestModal() {{
-                document.getElementById('viewRequestModal').style.display = 'none';
-                currentViewRequestId = null;
-            }}
-            
-            // Открытие модального окна для назначения мастера
-            async function openAssignMasterModal(requestId) {{
-                if (!{json.dumps(can_assign_masters)}) {{
-                    alert('У вас нет прав для назначения мастеров');
-                    return;
-                }}
-                
-                currentAssignRequestId = requestId;
-                selectedMasterId = null;
-                
-                try {{
-                    const response = await fetch('/api/masters');
-                    const masters = await response.json();
-                    
-                    const masterList = document.getElementById('masterList');
-                    masterList.innerHTML = '';
-                    
-                    if (masters.length === 0) {{
-                        masterList.innerHTML = '<p style="text-align: center; padding: 20px;">Нет доступных мастеров</p>';
-                    }} else {{
-                        masters.forEach(master => {{
-                            const masterItem = document.createElement('div');
-                            masterItem.className = 'master-item';
-                            masterItem.onclick = () => selectMaster(master.id, masterItem);
-                            
-                            masterItem.innerHTML = `
-                                <div class="master-info">
-                                    <div>
-                                        <div class="master-name">${{master.master_fio}}</div>
-                                        <div style="font-size: 12px; color: #666; margin-top: 2px;">${{master.master_phone}}</div>
-                                    </div>
-                                </div>
-                                <div style="font-size: 12px; color: #666; margin-top: 5px;">
-                                    Заявок в работе: <strong>${{master.active_requests || 0}}</strong>
-                                </div>
-                            `;
-                            
-                            masterList.appendChild(masterItem);
-                        }});
-                    }}
-                    
-                    document.getElementById('assignMasterModal').style.display = 'flex';
-                }} catch (error) {{
-                    console.error('Ошибка загрузки мастеров:', error);
-                    alert('Ошибка загрузки списка мастеров');
-                }}
-            }}
-            
-            // Выбор мастера
-            function selectMaster(masterId, element) {{
-                selectedMasterId = masterId;
-                
-                document.querySelectorAll('.master-item').forEach(item => {{
-                    item.classList.remove('selected');
-                }});
-                
-                element.classList.add('selected');
-            }}
-            
-            // Подтверждение назначения мастера
-            async function confirmAssignMaster() {{
-                if (!selectedMasterId) {{
-                    alert('Выберите мастера');
-                    return;
-                }}
-                
-                try {{
-                    const response = await fetch('/api/requests/' + currentAssignRequestId + '/assign', {{
-                        method: 'PUT',
-                        headers: {{ 'Content-Type': 'application/json' }},
-                        body: JSON.stringify({{ master_id: selectedMasterId }})
-                    }});
-                    
-                    const result = await response.json();
-                    if (result.success) {{
-                        alert('Мастер успешно назначен на заявку');
-                        closeAssignMasterModal();
-                        loadRequests();
-                        loadStats();
-                    }} else {{
-                        alert('Ошибка: ' + result.error);
-                    }}
-                }} catch (error) {{
-                    alert('Ошибка соединения с сервером');
-                }}
-            }}
-            
-            // Закрытие модального окна назначения мастера
-            function closeAssignMasterModal() {{
-                document.getElementById('assignMasterModal').style.display = 'none';
-                currentAssignRequestId = null;
-                selectedMasterId = null;
-            }}
-            
-            // Открытие модального окна для добавления комментария
-            async function openAddCommentModal(requestId) {{
-                currentCommentRequestId = requestId;
-                
-                // Сбрасываем состояние
-                document.getElementById('commentMessage').value = '';
-                document.getElementById('repairParts').value = '';
-                document.querySelectorAll('.template-comment-item').forEach(item => {{
-                    item.style.background = '#f8fafc';
-                    item.style.borderColor = '#e2e8f0';
-                }});
-                
-                // Загружаем шаблоны
-                await loadTemplateComments();
-                
-                document.getElementById('addCommentModal').style.display = 'flex';
-            }}
-            
-            // Подтверждение добавления комментария
-            async function confirmAddComment() {{
-                const comment = document.getElementById('commentMessage').value;
-                const repairParts = document.getElementById('repairParts').value;
-                
-                if (!comment) {{
-                    alert('Введите комментарий или выберите из списка');
-                    return;
-                }}
-                
-                try {{
-                    const response = await fetch('/api/comments', {{
-                        method: 'POST',
-                        headers: {{ 'Content-Type': 'application/json' }},
-                        body: JSON.stringify({{
-                            request_id: currentCommentRequestId,
-                            message: comment,
-                            repair_parts: repairParts
-                        }})
-                    }});
-                    
-                    const result = await response.json();
-                    if (result.success) {{
-                        alert('Комментарий успешно добавлен');
-                        closeAddCommentModal();
-                        loadRequests();
-                        loadComments();
-                        
-                        // Обновляем детали заявки, если открыто окно просмотра
-                        if (currentViewRequestId === currentCommentRequestId) {{
-                            viewRequestDetails(currentViewRequestId);
-                        }}
-                    }} else {{
-                        alert('Ошибка: ' + result.error);
-                    }}
-                }} catch (error) {{
-                    alert('Ошибка соединения с сервером');
-                }}
-            }}
-            
-            // Закрытие модального окна добавления комментария
-            function closeAddCommentModal() {{
-                document.getElementById('addCommentModal').style.display = 'none';
-                document.getElementById('commentMessage').value = '';
-                document.getElementById('repairParts').value = '';
-                currentCommentRequestId = null;
-            }}
-            
-            // Создание новой заявки
-            async function createNewRequest() {{
-                const formData = {{
-                    tech_type: document.getElementById('tech_type').value,
-                    tech_model: document.getElementById('tech_model').value,
-                    problem_description: document.getElementById('problem_description').value,
-                    client_fio: document.getElementById('client_fio').value,
-                    client_phone: document.getElementById('client_phone').value,
-                    request_status: document.getElementById('request_status').value
-                }};
-                
-                if (!formData.tech_type || !formData.tech_model || !formData.problem_description || 
-                    !formData.client_fio || !formData.client_phone) {{
-                    alert('Пожалуйста, заполните все обязательные поля');
-                    return;
-                }}
-                
-                try {{
-                    const response = await fetch('/api/requests', {{
-                        method: 'POST',
-                        headers: {{ 'Content-Type': 'application/json' }},
-                        body: JSON.stringify(formData)
-                    }});
-                    
-                    const result = await response.json();
-                    if (result.success) {{
-                        alert('Заявка №' + result.request_id + ' успешно создана!');
-                        document.getElementById('newRequestForm').reset();
-                        document.getElementById('client_fio').value = '{user_name}';
-                        showSection('requests');
-                        loadRequests();
-                        loadStats();
-                    }} else {{
-                        alert('Ошибка: ' + result.error);
-                    }}
-                }} catch (error) {{
-                    alert('Ошибка соединения с сервером');
-                }}
-            }}
-            
-            // Загрузка статистики
-            async function loadStats() {{
-                try {{
-                    const response = await fetch('/api/stats');
-                    const stats = await response.json();
-                    
-                    document.getElementById('totalRequests').textContent = stats.total_requests;
-                    document.getElementById('completedRequests').textContent = stats.completed_requests;
-                    document.getElementById('avgTime').textContent = stats.avg_days || '0';
-                    document.getElementById('inProcess').textContent = stats.in_process;
-                    
-                    // График распределения по статусам
-                    const statusCtx = document.getElementById('statusChart').getContext('2d');
-                    if (window.statusChart) {{
-                        window.statusChart.destroy();
-                    }}
-                    window.statusChart = new Chart(statusCtx, {{
-                        type: 'doughnut',
-                        data: {{
-                            labels: stats.status_distribution.map(item => item.status),
-                            datasets: [{{
-                                data: stats.status_distribution.map(item => item.count),
-                                backgroundColor: ['#3b82f6', '#f59e0b', '#10b981', '#8b5cf6', '#ef4444']
-                            }}]
-                        }},
-                        options: {{
-                            responsive: true,
-                            plugins: {{
-                                title: {{
-                                    display: true,
-                                    text: 'Распределение по статусам'
-                                }}
-                            }}
-                        }}
-                    }});
-                    
-                    // График распределения по типам оборудования
-                    const typeCtx = document.getElementById('typeChart').getContext('2d');
-                    if (window.typeChart) {{
-                        window.typeChart.destroy();
-                    }}
-                    window.typeChart = new Chart(typeCtx, {{
-                        type: 'bar',
-                        data: {{
-                            labels: stats.type_distribution.map(item => item.tech_type),
-                            datasets: [{{
-                                label: 'Количество',
-                                data: stats.type_distribution.map(item => item.count),
-                                backgroundColor: '#4facfe'
-                            }}]
-                        }},
-                        options: {{
-                            responsive: true,
-                            plugins: {{
-                                title: {{
-                                    display: true,
-                                    text: 'Распределение по типам оборудования'
-                                }}
-                            }}
-                        }}
-                    }});
-                    
-                    // Статистика по проблемам
-                    const problemStatsDiv = document.getElementById('problemStats');
-                    let problemStatsHtml = '<ul>';
-                    stats.problem_stats.forEach(item => {{
-                        problemStatsHtml += `<li><strong>${{item.problem_type}}:</strong> ${{item.count}} заявок (${{item.percentage}}%)</li>`;
-                    }});
-                    problemStatsHtml += '</ul>';
-                    problemStatsDiv.innerHTML = problemStatsHtml;
-                    
-                }} catch (error) {{
-                    console.error('Ошибка загрузки статистики:', error);
-                }}
-            }}
-            
-            // Загрузка мастеров
-            async function loadMasters() {{
-                try {{
-                    const response = await fetch('/api/masters');
-                    const masters = await response.json();
-                    
-                    const tbody = document.getElementById('mastersTableBody');
-                    tbody.innerHTML = '';
-                    
-                    masters.forEach(master => {{
-                        const row = document.createElement('tr');
-                        row.innerHTML = `
-                            <td>${{master.master_fio}}</td>
-                            <td>${{master.master_phone}}</td>
-                            <td>${{master.master_login}}</td>
-                            <td>${{master.master_type}}</td>
-                            <td>${{master.active_requests || 0}}</td>
-                            <td>${{master.total_requests || 0}}</td>
-                            <td>${{master.comment_count || 0}}</td>
-                        `;
-                        tbody.appendChild(row);
-                    }});
-                }} catch (error) {{
-                    console.error('Ошибка загрузки мастеров:', error);
-                }}
-            }}
-            
-            // Загрузка комментариев
-            async function loadComments() {{
-                try {{
-                    const response = await fetch('/api/comments');
-                    const comments = await response.json();
-                    
-                    const tbody = document.getElementById('commentsTableBody');
-                    tbody.innerHTML = '';
-                    
-                    if (comments.length === 0) {{
-                        tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 20px;">Нет комментариев</td></tr>';
-                        return;
-                    }}
-                    
-                    comments.forEach(comment => {{
-                        const row = document.createElement('tr');
-                        const sourceText = comment.comment_id ? 'Файл' : 'Система';
-                        const sourceClass = comment.comment_id ? 'comment-from-file' : 'comment-from-system';
-                        const userTypeDisplay = {{
-                            'admin': 'Администратор',
-                            'manager': 'Менеджер',
-                            'master': 'Мастер',
-                            'operator': 'Оператор',
-                            'client': 'Заказчик'
-                        }}[comment.user_type] || comment.user_type;
-                        
-                        row.innerHTML = `
-                            <td>${{comment.id}}</td>
-                            <td>Заявка №${{comment.request_id}}</td>
-                            <td>${{comment.user_fio || 'Неизвестно'}}</td>
-                            <td>${{userTypeDisplay}}</td>
-                            <td>${{comment.message}}</td>
-                            <td>${{new Date(comment.created_at).toLocaleDateString('ru-RU')}}</td>
-                            <td><span class="badge" style="background: ${{comment.comment_id ? '#10b981' : '#3b82f6'}}">${{sourceText}}</span></td>
-                        `;
-                        tbody.appendChild(row);
-                    }});
-                }} catch (error) {{
-                    console.error('Ошибка загрузки комментариев:', error);
-                }}
-            }}
-            
-            // Выход из системы без сообщений об ошибок
-            async function logout() {{
-                try {{
-                    await fetch('/api/logout');
-                }} catch (error) {{
-                    // Игнорируем любые ошибки соединения
-                }}
-                // Всегда перенаправляем на главную страницу
-                window.location.href = '/';
-            }}
-            
-            // Инициализация при загрузке
-            document.addEventListener('DOMContentLoaded', () => {{
-                console.log('DOM загружен, инициализация приложения');
-                loadRequests();
-                loadStats();
-                
-                // Закрытие модальных окон при клике вне их
-                document.addEventListener('click', (event) => {{
-                    if (event.target.classList.contains('modal')) {{
-                        event.target.style.display = 'none';
-                    }}
-                }});
-                
-                // Добавляем обработчик для кнопки выхода через addEventListener для надежности
-                const logoutBtn = document.querySelector('.logout-btn');
-                if (logoutBtn) {{
-                    logoutBtn.addEventListener('click', logout);
-                    console.log('Обработчик для кнопки выхода добавлен');
-                }}
-            }});
-        </script>
+        <script id="initialRequests" type="application/json">{initial_requests_json}</script>
+        <script id="pageContext" type="application/json">{page_context_json}</script>
+        <script src="{MAIN_JS_URL}"></script>
     </body>
     </html>
     '''
@@ -2325,12 +1691,20 @@ def render_main_page():
 
 # ========== API маршруты ==========
 
+# Готовые комментарии меняются только при загрузке файла комментариев,
+# поэтому список хранится в памяти процесса и перечитывается не чаще раза в TTL
+TEMPLATE_COMMENTS_TTL = 60
+_template_comments_cache = {'time': 0.0, 'data': None}
+
 @app.route('/api/template_comments')
 def get_template_comments():
     """Получение готовых комментариев из файла"""
     try:
-        conn = sqlite3.connect('service_requests.db')
-        conn.row_factory = sqlite3.Row
+        now = time.monotonic()
+        if _template_comments_cache['data'] is not None and now - _template_comments_cache['time'] < TEMPLATE_COMMENTS_TTL:
+            return json_response_with_etag(_template_comments_cache['data'], max_age=TEMPLATE_COMMENTS_TTL)
+        
+        conn = get_db()
         cursor = conn.cursor()
         
         # Получаем уникальные комментарии из файла (где comment_id не NULL)
@@ -2341,7 +1715,6 @@ def get_template_comments():
             ORDER BY message
         ''')
         rows = cursor.fetchall()
-        conn.close()
         
         template_comments = [row['message'] for row in rows]
         
@@ -2356,7 +1729,8 @@ def get_template_comments():
                 "Ремонт завершен успешно"
             ]
         
-        return jsonify(template_comments)
+        _template_comments_cache.update(time=now, data=template_comments)
+        return json_response_with_etag(template_comments, max_age=TEMPLATE_COMMENTS_TTL)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -2364,55 +1738,78 @@ def get_template_comments():
 def logout_api():
     """Выход из системы"""
     try:
-        print(f"Пользователь {session.get('user_login', 'неизвестный')} выходит из системы")
+        logger.info("Пользователь %s выходит из системы", session.get('user_login', 'неизвестный'))
         session.clear()
-        print("Сессия успешно очищена")
         return jsonify({"success": True})
-    except Exception as e:
-        print(f"Ошибка при выходе: {str(e)}")
+    except Exception:
+        logger.exception("Ошибка при выходе")
         # Возвращаем успех в любом случае, чтобы не показывать ошибку пользователю
         return jsonify({"success": True})
 
+# Заявки вместе с числом комментариев (подзапрос по индексу idx_comments_request_created),
+# чтобы клиенту не приходилось запрашивать комментарии каждой заявки отдельно
+REQUESTS_SELECT = '''SELECT service_requests.*,
+                    (SELECT COUNT(*) FROM comments
+                     WHERE comments.request_id = service_requests.request_id) AS comment_count
+                FROM service_requests'''
+
+# Размер страницы списка заявок (первая страница встраивается в главную страницу)
+REQUESTS_PAGE_SIZE = 200
+
+def select_requests_page(cursor, user_type, user_login, limit=None, offset=0):
+    """Выполнение запроса заявок, доступных пользователю, в порядке списка (страница при переданном limit)
+    
+    Возвращает курсор с результатом, строки читаются вызывающей стороной.
+    """
+    # request_id в сортировке делает порядок однозначным между страницами
+    page_sql = 'LIMIT ? OFFSET ?' if limit else ''
+    page_params = (limit, max(offset, 0)) if limit else ()
+    
+    if user_type == 'client':
+        cursor.execute(f'''
+            {REQUESTS_SELECT}
+            WHERE client_login = ? 
+            ORDER BY start_date DESC, request_id DESC
+            {page_sql}
+        ''', (user_login, *page_params))
+    elif user_type == 'master':
+        # ID мастера текущего пользователя хранится в сессии
+        master_id = session_master_id(cursor)
+        
+        if master_id is None:
+            # Пустой результат той же структуры
+            return cursor.execute(f"{REQUESTS_SELECT} WHERE 0")
+        cursor.execute(f'''
+            {REQUESTS_SELECT}
+            WHERE master_id = ?
+            ORDER BY start_date DESC, request_id DESC
+            {page_sql}
+        ''', (master_id, *page_params))
+    else:
+        cursor.execute(f'''
+            {REQUESTS_SELECT}
+            ORDER BY start_date DESC, request_id DESC
+            {page_sql}
+        ''', page_params)
+    
+    return cursor
+
 @app.route('/api/requests')
 def get_requests():
-    """Получение всех заявок"""
+    """Получение заявок (целиком или страницей при переданных limit/offset)"""
     try:
-        conn = sqlite3.connect('service_requests.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db()
         cursor = conn.cursor()
         
-        user_type = session.get('user_type')
-        user_login = session.get('user_login')
-        
-        if user_type == 'client':
-            cursor.execute('''
-                SELECT * FROM service_requests 
-                WHERE client_login = ? 
-                ORDER BY start_date DESC
-            ''', (user_login,))
-        elif user_type == 'master':
-            cursor.execute("SELECT id FROM masters WHERE master_login = ?", (user_login,))
-            master_result = cursor.fetchone()
-            
-            if master_result:
-                master_id = master_result[0]
-                cursor.execute('''
-                    SELECT * FROM service_requests 
-                    WHERE master_id = ?
-                    ORDER BY start_date DESC
-                ''', (master_id,))
-            else:
-                return jsonify([])
-        else:
-            cursor.execute('''
-                SELECT * FROM service_requests 
-                ORDER BY start_date DESC
-            ''')
-        
-        rows = cursor.fetchall()
-        conn.close()
+        select_requests_page(
+            cursor,
+            session.get('user_type'),
+            session.get('user_login'),
+            request.args.get('limit', type=int),
+            request.args.get('offset', 0, type=int)
+        )
         
-        return jsonify([dict(row) for row in rows])
+        return stream_json_rows(cursor)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -2420,8 +1817,7 @@ def get_requests():
 def get_request(request_id):
     """Получение конкретной заявки"""
     try:
-        conn = sqlite3.connect('service_requests.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -2429,7 +1825,6 @@ def get_request(request_id):
         ''', (request_id,))
         
         request_data = cursor.fetchone()
-        conn.close()
         
         if request_data:
             return jsonify(dict(request_data))
@@ -2447,32 +1842,34 @@ def create_request():
         if 'user_id' not in session:
             return jsonify({"success": False, "error": "Требуется авторизация"}), 401
         
-        conn = sqlite3.connect('service_requests.db')
+        conn = get_db()
         cursor = conn.cursor()
-        cursor.execute("SELECT MAX(request_id) FROM service_requests")
-        max_id = cursor.fetchone()[0] or 0
-        new_request_id = max_id + 1
         
+        # Номер заявки вычисляется в самом INSERT: чтение MAX и вставка выполняются
+        # одной командой, поэтому два одновременных запроса не получат один номер
+        # (MAX берется из уникального индекса request_id без просмотра таблицы)
         cursor.execute('''
             INSERT INTO service_requests (
                 request_id, start_date, tech_type, tech_model, problem_description,
-                request_status, client_fio, client_phone, client_login, client_type
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                problem_type, request_status, client_fio, client_phone, client_login, client_type
+            ) SELECT COALESCE(MAX(request_id), 0) + 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+              FROM service_requests
+            RETURNING request_id
         ''', (
-            new_request_id,
             datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             data['tech_type'],
             data['tech_model'],
             data['problem_description'],
+            classify_problem(data['problem_description']),
             data.get('request_status', 'Новая заявка'),
             data['client_fio'],
             data['client_phone'],
             session.get('user_login', ''),
             'client'
         ))
+        new_request_id = cursor.fetchone()[0]
         
         conn.commit()
-        conn.close()
         
         return jsonify({"success": True, "request_id": new_request_id})
     except Exception as e:
@@ -2492,30 +1889,34 @@ def assign_master(request_id):
         if not master_id:
             return jsonify({"success": False, "error": "Не указан ID мастера"}), 400
         
-        conn = sqlite3.connect('service_requests.db')
+        conn = get_db()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT master_fio, master_phone, master_login FROM masters WHERE id = ?", (master_id,))
-        master = cursor.fetchone()
-        
-        if not master:
-            return jsonify({"success": False, "error": "Мастер не найден"}), 404
-        
+        # Блокировка на запись берется сразу, а не повышается с чтения посреди транзакции;
+        # данные мастера подставляются в самом UPDATE без отдельного SELECT
+        cursor.execute("BEGIN IMMEDIATE")
         cursor.execute('''
             UPDATE service_requests 
-            SET master_id = ?, master_fio = ?, master_phone = ?, master_login = ?,
+            SET master_id = masters.id, master_fio = masters.master_fio,
+                master_phone = masters.master_phone, master_login = masters.master_login,
                 request_status = 'В процессе ремонта'
-            WHERE request_id = ?
-        ''', (master_id, master[0], master[1], master[2], request_id))
+            FROM masters
+            WHERE masters.id = ? AND service_requests.request_id = ?
+            RETURNING master_fio
+        ''', (master_id, request_id))
+        assigned = cursor.fetchone()
+        
+        if not assigned:
+            conn.rollback()
+            return jsonify({"success": False, "error": "Мастер или заявка не найдены"}), 404
         
         cursor.execute('''
             INSERT INTO status_history (request_id, old_status, new_status, changed_by, comment)
             VALUES (?, ?, ?, ?, ?)
         ''', (request_id, 'Новая заявка', 'В процессе ремонта', 
-              session.get('user_name', 'Система'), f'Назначен мастер: {master[0]}'))
+              session.get('user_name', 'Система'), f'Назначен мастер: {assigned[0]}'))
         
         conn.commit()
-        conn.close()
         
         return jsonify({"success": True})
     except Exception as e:
@@ -2525,25 +1926,19 @@ def assign_master(request_id):
 def get_stats():
     """Получение статистики"""
     try:
-        conn = sqlite3.connect('service_requests.db')
+        conn = get_db()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT COUNT(*) FROM service_requests")
-        total_requests = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM service_requests WHERE request_status = 'Готова к выдаче' OR request_status = 'Завершена'")
-        completed_requests = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM service_requests WHERE request_status = 'В процессе ремонта'")
-        in_process = cursor.fetchone()[0]
-        
+        # Общие показатели считаются за один проход по таблице
         cursor.execute('''
-            SELECT AVG(days_in_process) 
-            FROM service_requests 
-            WHERE (request_status = 'Готова к выдаче' OR request_status = 'Завершена') 
-            AND days_in_process IS NOT NULL AND days_in_process > 0
+            SELECT COUNT(*),
+                   COALESCE(SUM(request_status IN ('Готова к выдаче', 'Завершена')), 0),
+                   COALESCE(SUM(request_status = 'В процессе ремонта'), 0),
+                   AVG(CASE WHEN request_status IN ('Готова к выдаче', 'Завершена')
+                             AND days_in_process > 0 THEN days_in_process END)
+            FROM service_requests
         ''')
-        avg_days = cursor.fetchone()[0]
+        total_requests, completed_requests, in_process, avg_days = cursor.fetchone()
         avg_days = round(avg_days, 1) if avg_days else 0
         
         cursor.execute('''
@@ -2560,17 +1955,9 @@ def get_stats():
         ''')
         type_distribution = [{"tech_type": row[0], "count": row[1]} for row in cursor.fetchall()]
         
-        # Статистика по типам проблем (упрощенная)
+        # Статистика по типам проблем (тип определяется при добавлении заявки)
         cursor.execute('''
-            SELECT 
-                CASE 
-                    WHEN LOWER(problem_description) LIKE '%не работает%' OR LOWER(problem_description) LIKE '%перестал%' THEN 'Не работает'
-                    WHEN LOWER(problem_description) LIKE '%мороз%' OR LOWER(problem_description) LIKE '%холод%' THEN 'Проблемы с охлаждением'
-                    WHEN LOWER(problem_description) LIKE '%гудит%' OR LOWER(problem_description) LIKE '%шум%' THEN 'Шум/вибрация'
-                    WHEN LOWER(problem_description) LIKE '%включаться%' OR LOWER(problem_description) LIKE '%запуск%' THEN 'Проблемы с включением'
-                    ELSE 'Другое'
-                END as problem_type,
-                COUNT(*) as count
+            SELECT problem_type, COUNT(*) as count
             FROM service_requests 
             GROUP BY problem_type
         ''')
@@ -2586,7 +1973,6 @@ def get_stats():
                 "percentage": percentage
             })
         
-        conn.close()
         
         return jsonify({
             "total_requests": total_requests,
@@ -2604,25 +1990,32 @@ def get_stats():
 def get_masters():
     """Получение списка мастеров"""
     try:
-        conn = sqlite3.connect('service_requests.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db()
         cursor = conn.cursor()
         
+        # Счетчики считаются одним проходом по каждой таблице (GROUP BY master_id),
+        # а не отдельными подзапросами для каждого мастера
         cursor.execute('''
             SELECT m.*, 
-                   (SELECT COUNT(*) FROM service_requests sr 
-                    WHERE sr.master_id = m.id AND sr.request_status = 'В процессе ремонта') as active_requests,
-                   (SELECT COUNT(*) FROM service_requests sr 
-                    WHERE sr.master_id = m.id) as total_requests,
-                   (SELECT COUNT(*) FROM comments c 
-                    WHERE c.master_id = m.id) as comment_count
+                   COALESCE(sr.active_requests, 0) as active_requests,
+                   COALESCE(sr.total_requests, 0) as total_requests,
+                   COALESCE(c.comment_count, 0) as comment_count
             FROM masters m
+            LEFT JOIN (
+                SELECT master_id,
+                       SUM(request_status = 'В процессе ремонта') as active_requests,
+                       COUNT(*) as total_requests
+                FROM service_requests
+                GROUP BY master_id
+            ) sr ON sr.master_id = m.id
+            LEFT JOIN (
+                SELECT master_id, COUNT(*) as comment_count
+                FROM comments
+                GROUP BY master_id
+            ) c ON c.master_id = m.id
             ORDER BY m.master_fio
         ''')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return jsonify([dict(row) for row in rows])
+        return json_response_with_etag(fetch_dicts(cursor))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -2630,45 +2023,48 @@ def get_masters():
 def get_all_comments():
     """Получение всех комментариев"""
     try:
-        conn = sqlite3.connect('service_requests.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT c.*, u.user_type 
-            FROM comments c
-            LEFT JOIN users u ON c.user_id = u.id
-            ORDER BY c.created_at DESC
-        ''')
-        rows = cursor.fetchall()
-        conn.close()
+        # Комментарии только добавляются, поэтому последний id и их число однозначно задают список;
+        # если у браузера он уже есть, запрос всей таблицы не выполняется
+        cursor.execute("SELECT MAX(id), COUNT(*) FROM comments")
+        etag = 'comments-%s-%s' % tuple(cursor.fetchone())
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            cursor.execute('''
+                SELECT c.*
+                FROM comments c
+                ORDER BY c.created_at DESC
+            ''')
+            response = stream_json_rows(cursor)
         
-        return jsonify([dict(row) for row in rows])
+        response.set_etag(etag, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
     except Exception as e:
-        print(f"Ошибка при получении комментариев: {e}")
+        logger.exception("Ошибка при получении комментариев")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/comments/request/<int:request_id>')
 def get_comments_by_request(request_id):
     """Получение комментариев для заявки"""
     try:
-        conn = sqlite3.connect('service_requests.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT c.*, u.user_type 
+            SELECT c.*
             FROM comments c
-            LEFT JOIN users u ON c.user_id = u.id
             WHERE c.request_id = ?
-            ORDER BY c.created_at DESC
+            ORDER BY c.created_at DESC, c.id DESC
         ''', (request_id,))
-        rows = cursor.fetchall()
-        conn.close()
         
-        return jsonify([dict(row) for row in rows])
+        return jsonify(fetch_dicts(cursor))
     except Exception as e:
-        print(f"Ошибка при получении комментариев для заявки {request_id}: {e}")
+        logger.exception("Ошибка при получении комментариев для заявки %s", request_id)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/comments', methods=['POST'])
@@ -2684,113 +2080,115 @@ def add_comment():
         user_id = session.get('user_id')
         user_fio = session.get('user_name')
         
-        conn = sqlite3.connect('service_requests.db')
+        # Номер заявки проверяется до записи, чтобы некорректный запрос ничего не сохранил
+        try:
+            request_id = int(data['request_id'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"success": False, "error": "Некорректный номер заявки"}), 400
+        
+        conn = get_db()
         cursor = conn.cursor()
         
-        # Получаем ID мастера, если комментарий от мастера
-        master_id = None
-        if user_type == 'master':
-            cursor.execute("SELECT id FROM masters WHERE user_id = ?", (user_id,))
-            master_result = cursor.fetchone()
-            if master_result:
-                master_id = master_result[0]
+        # ID мастера берется из сессии, если комментарий от мастера
+        master_id = session_master_id(cursor) if user_type == 'master' else None
         
         # Добавляем комментарий
         cursor.execute('''
             INSERT INTO comments (request_id, master_id, user_id, user_fio, user_type, message)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (data['request_id'], master_id, user_id, user_fio, user_type, data['message']))
+            RETURNING id, created_at
+        ''', (request_id, master_id, user_id, user_fio, user_type, data['message']))
+        new_comment = cursor.fetchone()
         
-        # Обновляем флаг has_comment в заявке
+        # Флаг has_comment и запчасти (если указаны) обновляются одним запросом;
+        # если флаг уже стоит и запчастей нет, строка не перезаписывается
+        repair_parts = data.get('repair_parts') or None
         cursor.execute('''
             UPDATE service_requests 
-            SET has_comment = 1 
-            WHERE request_id = ?
-        ''', (data['request_id'],))
-        
-        # Обновляем запчасти, если указаны
-        if 'repair_parts' in data and data['repair_parts']:
-            cursor.execute('''
-                UPDATE service_requests 
-                SET repair_parts = COALESCE(repair_parts || ', ', '') || ?
-                WHERE request_id = ?
-            ''', (data['repair_parts'], data['request_id']))
+            SET has_comment = 1,
+                repair_parts = CASE WHEN ?1 IS NULL THEN repair_parts
+                                    ELSE COALESCE(repair_parts || ', ', '') || ?1 END
+            WHERE request_id = ?2 AND (has_comment = 0 OR ?1 IS NOT NULL)
+        ''', (repair_parts, request_id))
         
         conn.commit()
-        conn.close()
         
-        return jsonify({"success": True})
+        return jsonify({"success": True, "id": new_comment[0], "created_at": new_comment[1]})
     except Exception as e:
-        print(f"Ошибка при добавлении комментария: {e}")
+        logger.exception("Ошибка при добавлении комментария")
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Запросы поиска собираются один раз при загрузке модуля: текст SQL не строится
+# заново на каждый вызов, и sqlite3 берет подготовленный запрос из своего кеша
+SEARCH_FILTERS = {
+    'match': "id IN (SELECT rowid FROM requests_fts WHERE requests_fts MATCH :query)",
+    # Индекс триграмм не находит строки короче трех символов, такие ищутся перебором;
+    # встроенный LIKE не различает регистр только у латиницы, поэтому поля приводятся
+    # к нижнему регистру, как это делает индекс триграмм
+    'like': '(' + ' OR '.join(f"fold_case({col}) LIKE :query ESCAPE '\\'" for col in SEARCH_COLUMNS) + ')',
+}
+SEARCH_SCOPES = {
+    'client': "client_login = :scope AND ",
+    'master': "master_id = :scope AND ",
+    'all': "",
+}
+SEARCH_SQL = {
+    (scope, kind): f'''{REQUESTS_SELECT}
+                WHERE {scope_sql}{filter_sql}
+                ORDER BY start_date DESC, request_id DESC'''
+    for scope, scope_sql in SEARCH_SCOPES.items()
+    for kind, filter_sql in SEARCH_FILTERS.items()
+}
+
+def fold_case(value):
+    """Текст в нижнем регистре для поиска без учета регистра (функция SQL fold_case)"""
+    return value.lower() if isinstance(value, str) else value
+
+def search_condition(text):
+    """Вид отбора и параметр для поиска подстроки text во всех полях поиска (без учета регистра)"""
+    if len(text) >= 3:
+        # Вся строка ищется одной фразой, кавычки внутри удваиваются
+        return 'match', '"' + text.replace('"', '""') + '"'
+    # Символы % и _ в запросе ищутся как обычные символы
+    escaped = fold_case(text).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return 'like', f"%{escaped}%"
+
 @app.route('/api/requests/search')
 def search_requests():
     """Поиск заявок"""
     try:
-        query = request.args.get('q', '')
+        query = request.args.get('q', '').strip()
         user_type = session.get('user_type')
         user_login = session.get('user_login')
         
-        conn = sqlite3.connect('service_requests.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db()
         cursor = conn.cursor()
         
-        search_pattern = f"%{query}%"
+        # Пустой запрос возвращает все доступные заявки, как основной список
+        if not query:
+            select_requests_page(cursor, user_type, user_login)
+            return stream_json_rows(cursor)
         
+        kind, pattern = search_condition(query)
         if user_type == 'client':
-            cursor.execute('''
-                SELECT * FROM service_requests 
-                WHERE client_login = ? AND (
-                    request_id LIKE ? OR 
-                    problem_description LIKE ? OR 
-                    client_fio LIKE ? OR 
-                    client_phone LIKE ? OR
-                    tech_type LIKE ? OR
-                    tech_model LIKE ?
-                )
-                ORDER BY start_date DESC
-            ''', (user_login, search_pattern, search_pattern, search_pattern, search_pattern, search_pattern, search_pattern))
+            scope, scope_value = 'client', user_login
         elif user_type == 'master':
-            cursor.execute("SELECT id FROM masters WHERE master_login = ?", (user_login,))
-            master_result = cursor.fetchone()
-            
-            if master_result:
-                master_id = master_result[0]
-                cursor.execute('''
-                    SELECT * FROM service_requests 
-                    WHERE master_id = ? AND (
-                        request_id LIKE ? OR 
-                        problem_description LIKE ? OR 
-                        client_fio LIKE ? OR 
-                        client_phone LIKE ? OR
-                        tech_type LIKE ? OR
-                        tech_model LIKE ?
-                    )
-                    ORDER BY start_date DESC
-                ''', (master_id, search_pattern, search_pattern, search_pattern, search_pattern, search_pattern, search_pattern))
-            else:
+            master_id = session_master_id(cursor)
+            if master_id is None:
                 return jsonify([])
+            scope, scope_value = 'master', master_id
         else:
-            cursor.execute('''
-                SELECT * FROM service_requests 
-                WHERE request_id LIKE ? OR 
-                    problem_description LIKE ? OR 
-                    client_fio LIKE ? OR 
-                    client_phone LIKE ? OR
-                    tech_type LIKE ? OR
-                    tech_model LIKE ?
-                ORDER BY start_date DESC
-            ''', (search_pattern, search_pattern, search_pattern, search_pattern, search_pattern, search_pattern))
+            scope, scope_value = 'all', None
         
-        rows = cursor.fetchall()
-        conn.close()
+        cursor.execute(SEARCH_SQL[scope, kind], {'query': pattern, 'scope': scope_value})
         
-        return jsonify([dict(row) for row in rows])
+        return stream_json_rows(cursor)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 if __name__ == "__main__":
+    init_db()
+    
     print("="*60)
     print("Сервисный центр 'БытСервис' - Система учета заявок")
     print("Сервер доступен по адресу: http://localhost:8000")
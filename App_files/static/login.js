@@ -0,0 +1,24 @@
+// Автозаполнение полей при клике на учетную запись
+const loginInput = document.getElementById('login');
+const passwordInput = document.getElementById('password');
+
+// Один обработчик на весь список вместо отдельного на каждую учетную запись
+document.querySelector('.test-accounts').addEventListener('click', event => {
+    const item = event.target.closest('.account-item');
+    if (!item) {
+        return;
+    }
+
+    // Логин и пароль приходят с сервера уже в data-атрибутах
+    loginInput.value = item.dataset.login;
+    passwordInput.value = item.dataset.password;
+
+    // Подсвечиваем поля
+    loginInput.style.borderColor = '#4f46e5';
+    passwordInput.style.borderColor = '#4f46e5';
+
+    setTimeout(() => {
+        loginInput.style.borderColor = '';
+        passwordInput.style.borderColor = '';
+    }, 2000);
+});
@@ -0,0 +1,921 @@
+// Данные страницы, зависящие от пользователя, передаются сервером в <script id="pageContext">
+const PAGE_CONTEXT = JSON.parse(document.getElementById('pageContext').textContent);
+
+// Постоянные элементы страницы находятся один раз; элементы разделов статистики,
+// мастеров и комментариев появляются только при первом открытии и ищутся при загрузке
+const elements = {
+    requestsTableBody: document.getElementById('requestsTableBody'),
+    searchInput: document.getElementById('searchInput'),
+    commentMessage: document.getElementById('commentMessage'),
+    repairParts: document.getElementById('repairParts'),
+    templateComments: document.getElementById('templateComments'),
+    masterList: document.getElementById('masterList'),
+    assignMasterModal: document.getElementById('assignMasterModal'),
+    addCommentModal: document.getElementById('addCommentModal'),
+    viewRequestModal: document.getElementById('viewRequestModal'),
+    viewRequestTitle: document.getElementById('viewRequestTitle'),
+    viewRequestBody: document.getElementById('viewRequestBody'),
+    clientFio: document.getElementById('client_fio')
+};
+
+let currentAssignRequestId = null;
+let selectedMasterId = null;
+// Выделенный элемент списка мастеров: при выборе меняются только два элемента
+let selectedMasterElement = null;
+let currentEditRequestId = null;
+let currentCommentRequestId = null;
+let currentViewRequestId = null;
+
+// Обновление данных после изменений: вызовы в течение REFRESH_DELAY объединяются,
+// каждый загрузчик выполняется один раз, разные загрузчики - параллельно
+const REFRESH_DELAY = 100;
+const pendingRefresh = new Set();
+let refreshTimer = null;
+
+function scheduleRefresh(...loaders) {
+    loaders.forEach(loader => pendingRefresh.add(loader));
+    clearTimeout(refreshTimer);
+    refreshTimer = setTimeout(() => {
+        const batch = [...pendingRefresh];
+        pendingRefresh.clear();
+        Promise.all(batch.map(loader => loader()));
+    }, REFRESH_DELAY);
+}
+
+// Показ секций; живая коллекция активных секций обновляется сама, без повторного поиска
+const activeSections = document.getElementsByClassName('content-section active');
+
+function showSection(sectionId) {
+    while (activeSections.length) {
+        activeSections[0].classList.remove('active');
+    }
+    const section = document.getElementById(sectionId);
+    section.classList.add('active');
+    
+    // Разметка редко открываемых разделов хранится в <template> и вставляется при первом открытии
+    const lazyContent = section.querySelector('template.lazy-section');
+    if (lazyContent) lazyContent.replaceWith(lazyContent.content);
+    
+    // Загрузка данных для секции
+    if (sectionId === 'requests') loadRequests();
+    if (sectionId === 'stats') loadStats();
+    if (sectionId === 'masters') loadMasters();
+    if (sectionId === 'comments') loadComments();
+}
+
+// Виртуальная прокрутка таблиц: при длинных списках в DOM находятся
+// только видимые строки, остальное место занимают строки-распорки
+const VIRTUAL_THRESHOLD = 100;
+const VIRTUAL_OVERSCAN = 10;
+const VIRTUAL_MIN_ROWS = 30;
+const virtualTables = new Map();
+
+function renderVirtualTable(tbody, items, buildRow) {
+    const container = tbody.closest('.table-container');
+    let state = virtualTables.get(tbody.id);
+    if (!state) {
+        state = { items: [], buildRow: null, rowHeight: 50, measured: false, start: -1, end: -1 };
+        virtualTables.set(tbody.id, state);
+        container.addEventListener('scroll', () => renderVirtualWindow(tbody, state), {passive: true});
+    }
+    state.items = items;
+    state.buildRow = buildRow;
+    state.start = -1;
+    state.end = -1;
+    
+    // Небольшие списки выводятся целиком, как обычная таблица
+    if (items.length <= VIRTUAL_THRESHOLD) {
+        container.classList.remove('virtual-scroll');
+        const fragment = document.createDocumentFragment();
+        items.forEach(item => fragment.appendChild(buildRow(item)));
+        tbody.replaceChildren(fragment);
+        return;
+    }
+    
+    container.classList.add('virtual-scroll');
+    container.scrollTop = 0;
+    renderVirtualWindow(tbody, state);
+}
+
+// Дозагрузка строк в конец таблицы без сброса прокрутки
+function appendVirtualTable(tbody, items) {
+    const state = virtualTables.get(tbody.id);
+    state.items = state.items.concat(items);
+    state.start = -1;
+    state.end = -1;
+    renderVirtualWindow(tbody, state);
+}
+
+function renderVirtualWindow(tbody, state) {
+    if (state.items.length <= VIRTUAL_THRESHOLD) return;
+    
+    const container = tbody.closest('.table-container');
+    const visibleCount = Math.max(VIRTUAL_MIN_ROWS, Math.ceil(container.clientHeight / state.rowHeight));
+    const start = Math.max(0, Math.floor(container.scrollTop / state.rowHeight) - VIRTUAL_OVERSCAN);
+    const end = Math.min(state.items.length, start + visibleCount + 2 * VIRTUAL_OVERSCAN);
+    if (start === state.start && end === state.end) return;
+    state.start = start;
+    state.end = end;
+    
+    const columns = tbody.closest('table').tHead.rows[0].cells.length;
+    const fragment = document.createDocumentFragment();
+    fragment.appendChild(createSpacerRow(start * state.rowHeight, columns));
+    for (let i = start; i < end; i++) {
+        fragment.appendChild(state.buildRow(state.items[i]));
+    }
+    fragment.appendChild(createSpacerRow((state.items.length - end) * state.rowHeight, columns));
+    tbody.replaceChildren(fragment);
+    
+    // Высота строки уточняется по отрисованным строкам (один раз, при видимой таблице)
+    const rows = tbody.rows;
+    const measured = (rows[rows.length - 1].offsetTop - rows[1].offsetTop) / (end - start);
+    if (!state.measured && measured > 0) {
+        state.measured = true;
+        if (Math.abs(measured - state.rowHeight) > 1) {
+            state.rowHeight = measured;
+            state.start = -1;
+            renderVirtualWindow(tbody, state);
+        }
+    }
+}
+
+function createSpacerRow(height, columns) {
+    const row = document.createElement('tr');
+    row.className = 'virtual-spacer';
+    row.innerHTML = `<td colspan="${columns}" style="height: ${height}px; padding: 0; border: none;"></td>`;
+    return row;
+}
+
+// Строка таблицы заявок: копия шаблона requestRowTemplate, данные вставляются
+// через textContent (без разбора HTML и без подстановки разметки из данных)
+const requestRowTemplate = document.getElementById('requestRowTemplate').content.firstElementChild;
+const REQUEST_STATUS_CLASSES = Object.freeze({
+    'Новая заявка': 'badge-new',
+    'В процессе ремонта': 'badge-process',
+    'Готова к выдаче': 'badge-completed',
+    'Завершена': 'badge-completed',
+    'Ожидание запчастей': 'badge-waiting'
+});
+
+// Форматтеры дат создаются один раз, а не при каждом вызове toLocale*String
+const RU_DATE = new Intl.DateTimeFormat('ru-RU');
+const RU_DATETIME = new Intl.DateTimeFormat('ru-RU', { dateStyle: 'short', timeStyle: 'medium' });
+
+// Некорректная дата выводится пустой строкой (format бросает RangeError)
+function formatDate(value, formatter = RU_DATE) {
+    const date = new Date(value);
+    return isNaN(date) ? '' : formatter.format(date);
+}
+
+// Названия ролей для комментариев: один объект на страницу, а не на каждую строку
+const USER_TYPE_NAMES = Object.freeze({
+    'admin': 'Администратор',
+    'manager': 'Менеджер',
+    'master': 'Мастер',
+    'operator': 'Оператор',
+    'client': 'Заказчик'
+});
+
+function buildRequestRow(request) {
+    const row = requestRowTemplate.cloneNode(true);
+    const cells = row.children;
+    
+    // Количество комментариев приходит вместе с заявкой
+    const commentCount = request.comment_count || 0;
+    
+    row.dataset.requestId = request.request_id;
+    cells[0].textContent = request.request_id;
+    cells[1].textContent = formatDate(request.start_date);
+    cells[2].textContent = request.tech_type;
+    cells[3].textContent = request.tech_model;
+    cells[4].textContent = request.problem_description;
+    cells[5].firstElementChild.textContent = request.client_fio;
+    cells[5].lastElementChild.textContent = request.client_phone;
+    cells[6].firstElementChild.className = 'badge ' + (REQUEST_STATUS_CLASSES[request.request_status] || 'badge-new');
+    cells[6].firstElementChild.textContent = request.request_status;
+    cells[7].textContent = request.master_fio || 'Не назначен';
+    cells[8].textContent = commentCount > 0 ? commentCount + ' комментариев' : 'Нет';
+    return row;
+}
+
+// Кнопки действий в таблице заявок обрабатываются одним обработчиком
+const REQUEST_ACTIONS = {
+    view: viewRequestDetails,
+    assign: openAssignMasterModal,
+    comment: openAddCommentModal
+};
+elements.requestsTableBody.addEventListener('click', event => {
+    const button = event.target.closest('[data-action]');
+    if (!button) return;
+    REQUEST_ACTIONS[button.dataset.action](Number(button.closest('tr').dataset.requestId));
+});
+
+// Загрузка заявок
+// Заявки загружаются страницами: следующая страница запрашивается,
+// когда таблица прокручена почти до конца
+const REQUESTS_PAGE_SIZE = PAGE_CONTEXT.requestsPageSize;
+const requestsPaging = { offset: 0, done: true, loading: false, generation: 0 };
+
+function fetchRequestsPage(offset) {
+    return fetch(`/api/requests?limit=${REQUESTS_PAGE_SIZE}&offset=${offset}`).then(response => response.json());
+}
+
+// Первая страница, встроенная сервером в разметку, используется один раз - при открытии страницы
+function takeInitialRequests() {
+    const element = document.getElementById('initialRequests');
+    if (!element) return null;
+    element.remove();
+    return JSON.parse(element.textContent);
+}
+
+async function loadRequests() {
+    const generation = ++requestsPaging.generation;
+    requestsPaging.loading = true;
+    try {
+        const requests = takeInitialRequests() ?? await fetchRequestsPage(0);
+        if (generation !== requestsPaging.generation) return;
+        
+        requestsPaging.offset = requests.length;
+        requestsPaging.done = requests.length < REQUESTS_PAGE_SIZE;
+        
+        const tbody = elements.requestsTableBody;
+        
+        if (requests.length === 0) {
+            renderVirtualTable(tbody, [], buildRequestRow);
+            tbody.innerHTML = '<tr><td colspan="10" style="text-align: center; padding: 20px;">Нет заявок</td></tr>';
+            return;
+        }
+        
+        renderVirtualTable(tbody, requests, buildRequestRow);
+    } catch (error) {
+        console.error('Ошибка загрузки заявок:', error);
+        elements.requestsTableBody.innerHTML = '<tr><td colspan="10" style="text-align: center; color: red;">Ошибка загрузки данных</td></tr>';
+    } finally {
+        if (generation === requestsPaging.generation) requestsPaging.loading = false;
+    }
+}
+
+async function loadMoreRequests() {
+    if (requestsPaging.done || requestsPaging.loading) return;
+    
+    const generation = requestsPaging.generation;
+    requestsPaging.loading = true;
+    try {
+        const requests = await fetchRequestsPage(requestsPaging.offset);
+        if (generation !== requestsPaging.generation) return;
+        
+        requestsPaging.offset += requests.length;
+        requestsPaging.done = requests.length < REQUESTS_PAGE_SIZE;
+        appendVirtualTable(elements.requestsTableBody, requests);
+    } catch (error) {
+        console.error('Ошибка загрузки заявок:', error);
+    } finally {
+        if (generation === requestsPaging.generation) requestsPaging.loading = false;
+    }
+}
+
+elements.requestsTableBody.closest('.table-container').addEventListener('scroll', event => {
+    const container = event.currentTarget;
+    if (container.scrollTop + container.clientHeight > container.scrollHeight - 200) {
+        loadMoreRequests();
+    }
+}, {passive: true});
+
+// Поиск заявок: запрос уходит после паузы в наборе, предыдущий незавершенный запрос отменяется
+const SEARCH_DELAY = 200;
+let searchTimer = null;
+let searchController = null;
+
+function onSearchInput() {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(searchRequests, SEARCH_DELAY);
+}
+
+async function searchRequests() {
+    const query = elements.searchInput.value;
+    if (query.length < 2 && query.length > 0) return;
+    
+    if (searchController) searchController.abort();
+    searchController = null;
+    
+    // Пустой запрос возвращает обычный список: первая страница и дозагрузка при прокрутке
+    if (!query.trim()) {
+        loadRequests();
+        return;
+    }
+    searchController = new AbortController();
+    
+    // Результаты поиска приходят целиком: дозагрузка страниц списка останавливается
+    requestsPaging.generation++;
+    requestsPaging.done = true;
+    requestsPaging.loading = false;
+    
+    try {
+        const response = await fetch('/api/requests/search?q=' + encodeURIComponent(query), {signal: searchController.signal});
+        const requests = await response.json();
+        
+        const tbody = elements.requestsTableBody;
+        
+        if (requests.length === 0) {
+            renderVirtualTable(tbody, [], buildRequestRow);
+            tbody.innerHTML = '<tr><td colspan="10" style="text-align: center; padding: 20px;">Ничего не найдено</td></tr>';
+            return;
+        }
+        
+        renderVirtualTable(tbody, requests, buildRequestRow);
+    } catch (error) {
+        if (error.name === 'AbortError') return;
+        console.error('Ошибка поиска:', error);
+    }
+}
+
+// Кэш ответов API: в пределах ttl данные берутся из памяти,
+// после - перепроверяются по ETag, и при 304 используется сохраненная копия
+const apiCache = new Map();
+
+async function cachedFetch(url, ttl = 60000) {
+    const cached = apiCache.get(url);
+    if (cached && Date.now() - cached.time < ttl) {
+        return cached.data;
+    }
+    
+    const headers = cached && cached.etag ? { 'If-None-Match': cached.etag } : {};
+    const response = await fetch(url, { headers });
+    
+    if (response.status === 304 && cached) {
+        cached.time = Date.now();
+        return cached.data;
+    }
+    
+    const data = await response.json();
+    if (response.ok) {
+        apiCache.set(url, { data, etag: response.headers.get('ETag'), time: Date.now() });
+    }
+    return data;
+}
+
+// Загрузка шаблонов комментариев
+async function loadTemplateComments() {
+    try {
+        const templateComments = await cachedFetch('/api/template_comments');
+        
+        const container = elements.templateComments;
+        container.innerHTML = '';
+        
+        if (templateComments.length === 0) {
+            container.innerHTML = '<div style="text-align: center; color: #666; padding: 20px;">Нет доступных шаблонов комментариев</div>';
+            return;
+        }
+        
+        const fragment = document.createDocumentFragment();
+        templateComments.forEach(comment => {
+            const commentItem = document.createElement('div');
+            commentItem.className = 'template-comment-item';
+            commentItem.innerHTML = `
+                <div style="display: flex; justify-content: space-between; align-items: center;">
+                    <span></span>
+                    <i class="fas fa-plus" style="color: #4f46e5; font-size: 12px;"></i>
+                </div>
+            `;
+            commentItem.querySelector('span').textContent = comment;
+            fragment.appendChild(commentItem);
+        });
+        container.appendChild(fragment);
+        
+    } catch (error) {
+        console.error('Ошибка загрузки шаблонов комментариев:', error);
+    }
+}
+
+// Один обработчик на список шаблонов: выбранный шаблон выделяется и вставляется в поле
+elements.templateComments.addEventListener('click', event => {
+    const item = event.target.closest('.template-comment-item');
+    if (!item) return;
+    
+    clearTemplateSelection();
+    item.classList.add('selected');
+    elements.commentMessage.value = item.querySelector('span').textContent;
+});
+
+const selectedTemplateItems = elements.templateComments.getElementsByClassName('selected');
+
+function clearTemplateSelection() {
+    while (selectedTemplateItems.length) {
+        selectedTemplateItems[0].classList.remove('selected');
+    }
+}
+
+// Очистка комментария
+function clearComment() {
+    elements.commentMessage.value = '';
+    clearTemplateSelection();
+}
+
+// Комментарий в окне заявки: копия шаблона commentItemTemplate, текст вставляется через textContent
+const commentItemTemplate = document.getElementById('commentItemTemplate').content.firstElementChild;
+
+function buildCommentItem(comment) {
+    const item = commentItemTemplate.cloneNode(true);
+    item.classList.add(comment.comment_id ? 'comment-from-file' : 'comment-from-system');
+    item.querySelector('.comment-author').textContent = comment.user_fio || 'Неизвестный автор';
+    item.querySelector('.comment-user-type').textContent = USER_TYPE_NAMES[comment.user_type] || comment.user_type;
+    item.querySelector('.comment-date').textContent = formatDate(comment.created_at, RU_DATETIME);
+    item.querySelector('.comment-message').textContent = comment.message;
+    item.querySelector('.comment-source').textContent = 'Источник: ' + (comment.comment_id ? 'Из файла' : 'Из системы');
+    return item;
+}
+
+// Просмотр деталей заявки с комментариями
+async function viewRequestDetails(requestId) {
+    currentViewRequestId = requestId;
+    
+    try {
+        // Заявка и ее комментарии запрашиваются одновременно
+        const [requestData, comments] = await Promise.all([
+            fetch('/api/requests/' + requestId).then(response => response.json()),
+            fetch('/api/comments/request/' + requestId).then(response => response.json())
+        ]);
+        
+        elements.viewRequestTitle.textContent = `Заявка №${requestId}`;
+        
+        let masterInfo = 'Не назначен';
+        if (requestData.master_fio) {
+            masterInfo = `${requestData.master_fio} (${requestData.master_phone})`;
+        }
+        
+        let partsInfo = 'Не указаны';
+        if (requestData.repair_parts) {
+            partsInfo = requestData.repair_parts;
+        }
+        
+        // Добавляем кнопку для добавления комментария, если у пользователя есть права
+        let addCommentButton = '';
+        const userType = PAGE_CONTEXT.userType;
+        if (userType !== 'client') {
+            addCommentButton = `
+                <div style="margin-top: 20px; border-top: 1px solid var(--border-color); padding-top: 20px;">
+                    <button onclick="openAddCommentModal(${requestId})" style="padding: 10px 20px; background: var(--accent-color); color: white; border: none; border-radius: 5px; cursor: pointer;">
+                        <i class="fas fa-plus"></i> Добавить комментарий
+                    </button>
+                </div>
+            `;
+        }
+        
+        const modalBody = `
+            <div style="padding: 20px;">
+                <p><strong>Дата создания:</strong> ${formatDate(requestData.start_date)}</p>
+                <p><strong>Тип техники:</strong> ${requestData.tech_type}</p>
+                <p><strong>Модель:</strong> ${requestData.tech_model}</p>
+                <p><strong>Проблема:</strong> ${requestData.problem_description}</p>
+                <p><strong>Клиент:</strong> ${requestData.client_fio} (${requestData.client_phone})</p>
+                <p><strong>Статус:</strong> ${requestData.request_status}</p>
+                <p><strong>Мастер:</strong> ${masterInfo}</p>
+                <p><strong>Запасные части:</strong> ${partsInfo}</p>
+                ${requestData.completion_date ? 
+                    '<p><strong>Дата завершения:</strong> ' + formatDate(requestData.completion_date) + '</p>' : ''}
+                <div class="comments-section">
+                    <h3>Комментарии:</h3>
+                </div>
+                ${addCommentButton}
+            </div>
+        `;
+        
+        elements.viewRequestBody.innerHTML = modalBody;
+        
+        // Комментарии приходят с сервера уже отсортированными (новые сверху)
+        const commentsSection = elements.viewRequestBody.querySelector('.comments-section');
+        if (comments.length === 0) {
+            commentsSection.insertAdjacentHTML('beforeend', '<p>Нет комментариев</p>');
+        } else {
+            const fragment = document.createDocumentFragment();
+            comments.forEach(comment => fragment.appendChild(buildCommentItem(comment)));
+            commentsSection.appendChild(fragment);
+        }
+        elements.viewRequestModal.style.display = 'flex';
+        
+    } catch (error) {
+        console.error('Ошибка загрузки данных заявки:', error);
+        alert('Ошибка загрузки данных заявки');
+    }
+}
+
+// Закрытие модального окна просмотра заявки
+function closeViewRequestModal() {
+    elements.viewRequestModal.style.display = 'none';
+    currentViewRequestId = null;
+}
+
+// Открытие модального окна для назначения мастера
+async function openAssignMasterModal(requestId) {
+    if (!PAGE_CONTEXT.canAssignMasters) {
+        alert('У вас нет прав для назначения мастеров');
+        return;
+    }
+    
+    currentAssignRequestId = requestId;
+    selectedMasterId = null;
+    selectedMasterElement = null;
+    
+    try {
+        const masters = await cachedFetch('/api/masters');
+        
+        const masterList = elements.masterList;
+        masterList.innerHTML = '';
+        
+        if (masters.length === 0) {
+            masterList.innerHTML = '<p style="text-align: center; padding: 20px;">Нет доступных мастеров</p>';
+        } else {
+            // Элементы собираются вне документа и вставляются в список одной операцией
+            const fragment = document.createDocumentFragment();
+            masters.forEach(master => {
+                const masterItem = document.createElement('div');
+                masterItem.className = 'master-item';
+                masterItem.dataset.id = master.id;
+                
+                masterItem.innerHTML = `
+                    <div class="master-info">
+                        <div>
+                            <div class="master-name">${master.master_fio}</div>
+                            <div style="font-size: 12px; color: #666; margin-top: 2px;">${master.master_phone}</div>
+                        </div>
+                    </div>
+                    <div style="font-size: 12px; color: #666; margin-top: 5px;">
+                        Заявок в работе: <strong>${master.active_requests || 0}</strong>
+                    </div>
+                `;
+                
+                fragment.appendChild(masterItem);
+            });
+            masterList.appendChild(fragment);
+        }
+        
+        elements.assignMasterModal.style.display = 'flex';
+    } catch (error) {
+        console.error('Ошибка загрузки мастеров:', error);
+        alert('Ошибка загрузки списка мастеров');
+    }
+}
+
+// Один обработчик на список мастеров вместо отдельного на каждый элемент
+elements.masterList.addEventListener('click', event => {
+    const item = event.target.closest('.master-item');
+    if (item) selectMaster(Number(item.dataset.id), item);
+});
+
+// Выбор мастера
+function selectMaster(masterId, element) {
+    selectedMasterId = masterId;
+    
+    if (selectedMasterElement) selectedMasterElement.classList.remove('selected');
+    element.classList.add('selected');
+    selectedMasterElement = element;
+}
+
+// Подтверждение назначения мастера
+async function confirmAssignMaster() {
+    if (!selectedMasterId) {
+        alert('Выберите мастера');
+        return;
+    }
+    
+    try {
+        const response = await fetch('/api/requests/' + currentAssignRequestId + '/assign', {
+            method: 'PUT',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ master_id: selectedMasterId })
+        });
+        
+        const result = await response.json();
+        if (result.success) {
+            alert('Мастер успешно назначен на заявку');
+            closeAssignMasterModal();
+            scheduleRefresh(loadRequests);
+        } else {
+            alert('Ошибка: ' + result.error);
+        }
+    } catch (error) {
+        alert('Ошибка соединения с сервером');
+    }
+}
+
+// Закрытие модального окна назначения мастера
+function closeAssignMasterModal() {
+    elements.assignMasterModal.style.display = 'none';
+    currentAssignRequestId = null;
+    selectedMasterId = null;
+    selectedMasterElement = null;
+}
+
+// Открытие модального окна для добавления комментария
+async function openAddCommentModal(requestId) {
+    currentCommentRequestId = requestId;
+    
+    // Сбрасываем состояние
+    elements.commentMessage.value = '';
+    elements.repairParts.value = '';
+    clearTemplateSelection();
+    
+    // Загружаем шаблоны
+    await loadTemplateComments();
+    
+    elements.addCommentModal.style.display = 'flex';
+}
+
+// Подтверждение добавления комментария
+async function confirmAddComment() {
+    const comment = elements.commentMessage.value;
+    const repairParts = elements.repairParts.value;
+    
+    if (!comment) {
+        alert('Введите комментарий или выберите из списка');
+        return;
+    }
+    
+    try {
+        const response = await fetch('/api/comments', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                request_id: currentCommentRequestId,
+                message: comment,
+                repair_parts: repairParts
+            })
+        });
+        
+        const result = await response.json();
+        if (result.success) {
+            alert('Комментарий успешно добавлен');
+            closeAddCommentModal();
+            scheduleRefresh(loadRequests, loadComments);
+            
+            // Обновляем детали заявки, если открыто окно просмотра
+            if (currentViewRequestId === currentCommentRequestId) {
+                viewRequestDetails(currentViewRequestId);
+            }
+        } else {
+            alert('Ошибка: ' + result.error);
+        }
+    } catch (error) {
+        alert('Ошибка соединения с сервером');
+    }
+}
+
+// Закрытие модального окна добавления комментария
+function closeAddCommentModal() {
+    elements.addCommentModal.style.display = 'none';
+    elements.commentMessage.value = '';
+    elements.repairParts.value = '';
+    currentCommentRequestId = null;
+}
+
+// Создание новой заявки
+async function createNewRequest() {
+    const formData = {
+        tech_type: document.getElementById('tech_type').value,
+        tech_model: document.getElementById('tech_model').value,
+        problem_description: document.getElementById('problem_description').value,
+        client_fio: elements.clientFio.value,
+        client_phone: document.getElementById('client_phone').value,
+        request_status: document.getElementById('request_status').value
+    };
+    
+    if (!formData.tech_type || !formData.tech_model || !formData.problem_description || 
+        !formData.client_fio || !formData.client_phone) {
+        alert('Пожалуйста, заполните все обязательные поля');
+        return;
+    }
+    
+    try {
+        const response = await fetch('/api/requests', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(formData)
+        });
+        
+        const result = await response.json();
+        if (result.success) {
+            alert('Заявка №' + result.request_id + ' успешно создана!');
+            document.getElementById('newRequestForm').reset();
+            elements.clientFio.value = PAGE_CONTEXT.userName;
+            // showSection сама загружает список заявок
+            showSection('requests');
+        } else {
+            alert('Ошибка: ' + result.error);
+        }
+    } catch (error) {
+        alert('Ошибка соединения с сервером');
+    }
+}
+
+// Chart.js подгружается при первом открытии статистики; промис сохраняется,
+// чтобы библиотека загружалась один раз
+const CHART_JS_URL = 'https://cdn.jsdelivr.net/npm/chart.js';
+let chartJsPromise = null;
+
+function loadChartJs() {
+    if (!chartJsPromise) {
+        chartJsPromise = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = CHART_JS_URL;
+            script.onload = resolve;
+            script.onerror = () => {
+                chartJsPromise = null;
+                reject(new Error('Не удалось загрузить Chart.js'));
+            };
+            document.head.appendChild(script);
+        });
+    }
+    return chartJsPromise;
+}
+
+// Графики статистики по id холста (window[id] указывает на сам элемент <canvas>, поэтому храним отдельно)
+const statsCharts = {};
+
+// График создаётся один раз; при повторной загрузке меняются только данные, без пересоздания и анимации
+function renderChart(canvasId, config) {
+    const chart = statsCharts[canvasId];
+    if (!chart) {
+        statsCharts[canvasId] = new Chart(document.getElementById(canvasId).getContext('2d'), config);
+        return;
+    }
+    chart.data.labels = config.data.labels;
+    chart.data.datasets[0].data = config.data.datasets[0].data;
+    chart.update('none');
+}
+
+// Загрузка статистики
+
+async function loadStats() {
+    try {
+        const [stats] = await Promise.all([
+            fetch('/api/stats').then(response => response.json()),
+            loadChartJs()
+        ]);
+        
+        document.getElementById('totalRequests').textContent = stats.total_requests;
+        document.getElementById('completedRequests').textContent = stats.completed_requests;
+        document.getElementById('avgTime').textContent = stats.avg_days || '0';
+        document.getElementById('inProcess').textContent = stats.in_process;
+        
+        // График распределения по статусам
+        renderChart('statusChart', {
+            type: 'doughnut',
+            data: {
+                labels: stats.status_distribution.map(item => item.status),
+                datasets: [{
+                    data: stats.status_distribution.map(item => item.count),
+                    backgroundColor: ['#3b82f6', '#f59e0b', '#10b981', '#8b5cf6', '#ef4444']
+                }]
+            },
+            options: {
+                responsive: true,
+                plugins: {
+                    title: {
+                        display: true,
+                        text: 'Распределение по статусам'
+                    }
+                }
+            }
+        });
+        
+        // График распределения по типам оборудования
+        renderChart('typeChart', {
+            type: 'bar',
+            data: {
+                labels: stats.type_distribution.map(item => item.tech_type),
+                datasets: [{
+                    label: 'Количество',
+                    data: stats.type_distribution.map(item => item.count),
+                    backgroundColor: '#4facfe'
+                }]
+            },
+            options: {
+                responsive: true,
+                plugins: {
+                    title: {
+                        display: true,
+                        text: 'Распределение по типам оборудования'
+                    }
+                }
+            }
+        });
+        
+        // Статистика по проблемам
+        const problemStatsDiv = document.getElementById('problemStats');
+        let problemStatsHtml = '<ul>';
+        stats.problem_stats.forEach(item => {
+            problemStatsHtml += `<li><strong>${item.problem_type}:</strong> ${item.count} заявок (${item.percentage}%)</li>`;
+        });
+        problemStatsHtml += '</ul>';
+        problemStatsDiv.innerHTML = problemStatsHtml;
+        
+    } catch (error) {
+        console.error('Ошибка загрузки статистики:', error);
+    }
+}
+
+// Строка из текстовых ячеек: значения вставляются через textContent, без разбора HTML на каждую строку
+function buildTextRow(values) {
+    const row = document.createElement('tr');
+    for (const value of values) {
+        row.insertCell().textContent = value;
+    }
+    return row;
+}
+
+// Строка таблицы мастеров
+function buildMasterRow(master) {
+    return buildTextRow([
+        master.master_fio,
+        master.master_phone,
+        master.master_login,
+        master.master_type,
+        master.active_requests || 0,
+        master.total_requests || 0,
+        master.comment_count || 0
+    ]);
+}
+
+// Загрузка мастеров
+async function loadMasters() {
+    try {
+        // Счетчики заявок меняются, поэтому таблица всегда перепроверяется по ETag
+        const masters = await cachedFetch('/api/masters', 0);
+        
+        renderVirtualTable(document.getElementById('mastersTableBody'), masters, buildMasterRow);
+    } catch (error) {
+        console.error('Ошибка загрузки мастеров:', error);
+    }
+}
+
+// Строка таблицы комментариев
+function buildCommentRow(comment) {
+    const row = buildTextRow([
+        comment.id,
+        'Заявка №' + comment.request_id,
+        comment.user_fio || 'Неизвестно',
+        USER_TYPE_NAMES[comment.user_type] || comment.user_type,
+        comment.message,
+        formatDate(comment.created_at)
+    ]);
+    
+    const badge = document.createElement('span');
+    badge.className = comment.comment_id ? 'badge badge-file' : 'badge badge-system';
+    badge.textContent = comment.comment_id ? 'Файл' : 'Система';
+    row.insertCell().appendChild(badge);
+    return row;
+}
+
+// Загрузка комментариев
+async function loadComments() {
+    // Раздел еще не открывался - таблица загрузится при первом открытии
+    const tbody = document.getElementById('commentsTableBody');
+    if (!tbody) return;
+    
+    try {
+        const response = await fetch('/api/comments');
+        const comments = await response.json();
+        
+        if (comments.length === 0) {
+            renderVirtualTable(tbody, [], buildCommentRow);
+            tbody.innerHTML = '<tr><td colspan="7" style="text-align: center; padding: 20px;">Нет комментариев</td></tr>';
+            return;
+        }
+        
+        renderVirtualTable(tbody, comments, buildCommentRow);
+    } catch (error) {
+        console.error('Ошибка загрузки комментариев:', error);
+    }
+}
+
+// Выход из системы без сообщений об ошибок
+async function logout() {
+    try {
+        await fetch('/api/logout');
+    } catch (error) {
+        // Игнорируем любые ошибки соединения
+    }
+    // Всегда перенаправляем на главную страницу
+    window.location.href = '/';
+}
+
+// Инициализация при загрузке
+document.addEventListener('DOMContentLoaded', () => {
+    console.log('DOM загружен, инициализация приложения');
+    loadRequests();
+    // Статистика загружается только при открытии ее раздела (showSection)
+    
+    // Закрытие модальных окон при клике вне их
+    document.addEventListener('click', (event) => {
+        if (event.target.classList.contains('modal')) {
+            event.target.style.display = 'none';
+        }
+    });
+    
+    // Добавляем обработчик для кнопки выхода через addEventListener для надежности
+    const logoutBtn = document.querySelector('.logout-btn');
+    if (logoutBtn) {
+        logoutBtn.addEventListener('click', logout);
+        console.log('Обработчик для кнопки выхода добавлен');
+    }
+});
@@ -35,6 +35,14 @@ class RequestStatus(Enum):
     COMPLETED = "Выполнена"
     CANCELLED = "Отменена"
 
+# Название роли по user_type_id
+USER_ROLE_NAMES = {
+    1: UserRole.MANAGER.value,
+    2: UserRole.SPECIALIST.value,
+    3: UserRole.OPERATOR.value,
+    4: UserRole.CLIENT.value
+}
+
 # ============================================================================
 # 2. МОДЕЛИ ДАННЫХ
 # ============================================================================
@@ -52,13 +60,7 @@ class User:
     
     @property
     def role(self) -> str:
-        roles = {
-            1: UserRole.MANAGER.value,
-            2: UserRole.SPECIALIST.value,
-            3: UserRole.OPERATOR.value,
-            4: UserRole.CLIENT.value
-        }
-        return roles.get(self.user_type_id, "Неизвестно")
+        return USER_ROLE_NAMES.get(self.user_type_id, "Неизвестно")
 
 @dataclass
 class RepairRequest:
@@ -108,6 +110,9 @@ class RepairSystemDatabase:
             self.conn.row_factory = sqlite3.Row
             self.conn.execute("PRAGMA foreign_keys = ON")
             self.conn.execute("PRAGMA journal_mode = WAL")
+            # В режиме WAL fsync при каждой фиксации не нужен; страницы читаются через mmap (до 256 МБ)
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self.conn.execute("PRAGMA mmap_size = 268435456")
         return self.conn
     
     def disconnect(self):
@@ -235,7 +240,8 @@ class RepairSystemDatabase:
                 "CREATE INDEX IF NOT EXISTS idx_requests_client ON repair_requests(client_id)",
                 "CREATE INDEX IF NOT EXISTS idx_requests_master ON repair_requests(master_id)",
                 "CREATE INDEX IF NOT EXISTS idx_requests_dates ON repair_requests(start_date, completion_date)",
-                "CREATE INDEX IF NOT EXISTS idx_comments_request ON comments(request_id)",
+                "CREATE INDEX IF NOT EXISTS idx_comments_request_created ON comments(request_id, created_at)",
+                "DROP INDEX IF EXISTS idx_comments_request",
                 "CREATE INDEX IF NOT EXISTS idx_comments_master ON comments(master_id)"
             ]
             